@@ -0,0 +1,188 @@
+import sys
+from array import array
+from collections import namedtuple
+
+from models import AttemptAnswers, Score, UserResponse, db
+from sqlalchemy import func, insert, select
+
+# Both arrays are stored little-endian: question ids as int32, answers as int8
+SKIPPED = -1
+# Stored for a selected option that does not fit in a byte (graded wrong anyway)
+INVALID_OPTION = 0
+
+# One element of the row-per-question view, shaped like a UserResponse row
+ResponseRow = namedtuple(
+    "ResponseRow", "attempt_id user_id quiz_id question_id option_selected attempted_at"
+)
+
+
+def pack_question_ids(question_ids):
+    packed = array("i", question_ids)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_question_ids(blob):
+    question_ids = array("i")
+    question_ids.frombytes(blob)
+    if sys.byteorder == "big":
+        question_ids.byteswap()
+    return question_ids
+
+
+def pack_answers(options):
+    return array(
+        "b", (option if -128 <= option <= 127 else INVALID_OPTION for option in options)
+    ).tobytes()
+
+
+def unpack_answers(blob):
+    answers = array("b")
+    answers.frombytes(blob)
+    return answers
+
+
+def pack_rows(rows):
+    """(question_ids, answers) blobs for the rows returned by grade_responses."""
+    return (
+        pack_question_ids(row["question_id"] for row in rows),
+        pack_answers(row["option_selected"] for row in rows),
+    )
+
+
+def attempt_responses(attempt):
+    """{question_id: option selected or SKIPPED} for one AttemptAnswers row."""
+    return dict(
+        zip(unpack_question_ids(attempt.question_ids), unpack_answers(attempt.answers))
+    )
+
+
+def latest_attempt(user_id, quiz_id):
+    """The user's most recent AttemptAnswers row for a quiz, or None."""
+    return (
+        AttemptAnswers.query.filter_by(user_id=user_id, quiz_id=quiz_id)
+        .order_by(AttemptAnswers.id.desc())
+        .first()
+    )
+
+
+def iter_attempt_batches(after_id=0, batch_size=1000, quiz_id=None, user_id=None):
+    """AttemptAnswers rows with id > `after_id` in id order, `batch_size` at a time (keyset)."""
+    query = select(
+        AttemptAnswers.id,
+        AttemptAnswers.user_id,
+        AttemptAnswers.quiz_id,
+        AttemptAnswers.question_ids,
+        AttemptAnswers.answers,
+        AttemptAnswers.attempted_at,
+    )
+    if quiz_id is not None:
+        query = query.where(AttemptAnswers.quiz_id == quiz_id)
+    if user_id is not None:
+        query = query.where(AttemptAnswers.user_id == user_id)
+
+    while True:
+        rows = db.session.execute(
+            query.where(AttemptAnswers.id > after_id)
+            .order_by(AttemptAnswers.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1][0]
+
+
+def expand(attempts):
+    """Unpack attempt rows from iter_attempt_batches into ResponseRows."""
+    for attempt_id, user_id, quiz_id, question_ids, answers, attempted_at in attempts:
+        for question_id, option in zip(
+            unpack_question_ids(question_ids), unpack_answers(answers)
+        ):
+            yield ResponseRow(
+                attempt_id, user_id, quiz_id, question_id, option, attempted_at
+            )
+
+
+def response_rows(quiz_id=None, user_id=None, batch_size=1000):
+    """
+    The old row-per-question view over packed attempts, optionally for one
+    quiz and/or user, in attempt order. Streams `batch_size` attempts at a time.
+    """
+    for attempts in iter_attempt_batches(0, batch_size, quiz_id, user_id):
+        yield from expand(attempts)
+
+
+# ------------------- Migration from UserResponse ---------------------
+def pack_user_responses(conn, batch_size=1000):
+    """
+    Copy every UserResponse row into AttemptAnswers and return the number of
+    attempts written. The UserResponse rows are left in place as the frozen
+    row-per-question history that existing SQL consumers read, until a later
+    migration drops the table.
+
+    UserResponse has no attempt id, but each submission wrote its rows in one
+    batch in question-id order, so per user and quiz (in id order) a new
+    attempt starts wherever the question id stops increasing. When a user has
+    exactly as many Score rows for the quiz as attempts were found, they are
+    paired in order and the attempt takes the score's id and timestamp.
+    """
+    scores = {}
+    for score_id, user_id, quiz_id, attempted_at in conn.execute(
+        select(Score.id, Score.user_id, Score.quiz_id, Score.timestamp_of_attempt)
+        .order_by(Score.id)
+    ):
+        scores.setdefault((user_id, quiz_id), []).append((score_id, attempted_at))
+
+    pending = []
+    written = 0
+
+    def flush():
+        nonlocal written
+        if pending:
+            conn.execute(insert(AttemptAnswers.__table__), pending)
+            written += len(pending)
+            pending.clear()
+
+    def add_group(key, attempts):
+        paired = scores.get(key, [])
+        if len(paired) != len(attempts):
+            paired = [(None, None)] * len(attempts)
+        for (question_ids, answers), (score_id, attempted_at) in zip(attempts, paired):
+            pending.append(
+                {
+                    "score_id": score_id,
+                    "user_id": key[0],
+                    "quiz_id": key[1],
+                    "question_ids": pack_question_ids(question_ids),
+                    "answers": pack_answers(answers),
+                    "attempted_at": attempted_at,
+                }
+            )
+        if len(pending) >= batch_size:
+            flush()
+
+    rows = conn.execution_options(yield_per=batch_size * 50).execute(
+        select(
+            UserResponse.user_id,
+            UserResponse.quiz_id,
+            func.coalesce(UserResponse.question_id, 0),
+            func.coalesce(UserResponse.option_selected, SKIPPED),
+        ).order_by(UserResponse.user_id, UserResponse.quiz_id, UserResponse.id)
+    )
+
+    key, attempts = None, []
+    for user_id, quiz_id, question_id, option in rows:
+        if (user_id, quiz_id) != key:
+            if attempts:
+                add_group(key, attempts)
+            key, attempts = (user_id, quiz_id), []
+        if not attempts or question_id <= attempts[-1][0][-1]:
+            attempts.append(([], []))
+        attempts[-1][0].append(question_id)
+        attempts[-1][1].append(option)
+    if attempts:
+        add_group(key, attempts)
+    flush()
+    return written
@@ -0,0 +1,258 @@
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+from attempt_answers import expand, iter_attempt_batches
+from models import AttemptAnswers, Result, Score, db
+from sqlalchemy import select
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # only the analytics export needs it
+    pa = pq = None
+
+EXPORT_DIR = os.path.join("exports", "analytics")
+WATERMARK_FILE = os.path.join(EXPORT_DIR, "watermarks.json")
+COMPRESSION = "zstd"
+
+# table -> (model, timestamp column or None, [(column, arrow type name)]).
+# attempt_response is the row-per-question view of AttemptAnswers, keyed by
+# attempt id.
+TABLES = {
+    "score": (
+        Score,
+        "timestamp_of_attempt",
+        [
+            ("id", "int64"),
+            ("quiz_id", "int64"),
+            ("user_id", "int64"),
+            ("timestamp_of_attempt", "timestamp"),
+            ("correct", "int32"),
+            ("wrong", "int32"),
+            ("unattempted", "int32"),
+            ("total_score", "int32"),
+            ("status", "string"),
+        ],
+    ),
+    "result": (
+        Result,
+        "attempted_on",
+        [
+            ("id", "int64"),
+            ("user_id", "int64"),
+            ("quiz_id", "int64"),
+            ("score", "float64"),
+            ("correct_answers", "int32"),
+            ("total_questions", "int32"),
+            ("attempted_on", "timestamp"),
+        ],
+    ),
+    "attempt_response": (
+        AttemptAnswers,
+        "attempted_at",
+        [
+            ("attempt_id", "int64"),
+            ("user_id", "int64"),
+            ("quiz_id", "int64"),
+            ("question_id", "int64"),
+            ("option_selected", "int8"),
+            ("attempted_at", "timestamp"),
+        ],
+    ),
+}
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow is required for the analytics export")
+
+
+def arrow_schema(columns):
+    types = {
+        "int8": pa.int8(),
+        "int32": pa.int32(),
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "string": pa.string(),
+        "timestamp": pa.timestamp("us"),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+def load_watermarks():
+    """Highest id already exported per table, from the last successful run."""
+    if not os.path.exists(WATERMARK_FILE):
+        return {}
+    with open(WATERMARK_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_watermarks(watermarks):
+    tmp_path = WATERMARK_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(watermarks, f, indent=2)
+    os.replace(tmp_path, WATERMARK_FILE)
+
+
+def iter_batches(model, columns, after_id, batch_size):
+    """Rows with id > `after_id` in id order, `batch_size` at a time (keyset)."""
+    if model is AttemptAnswers:
+        # Unpacked to one row per question, still `batch_size` rows at a time
+        rows = []
+        for attempts in iter_attempt_batches(after_id, batch_size):
+            for row in expand(attempts):
+                rows.append(row)
+                if len(rows) == batch_size:
+                    yield rows
+                    rows = []
+        if rows:
+            yield rows
+        return
+
+    selected = [getattr(model, name) for name, _ in columns]
+    while True:
+        rows = db.session.execute(
+            select(*selected)
+            .where(model.id > after_id)
+            .order_by(model.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1][0]
+
+
+def export_table(name, directory, after_id, batch_size):
+    """Write one table's new rows to a Parquet file and describe it."""
+    model, timestamp_column, columns = TABLES[name]
+    schema = arrow_schema(columns)
+    filename = f"{name}.parquet"
+    entry = {
+        "file": filename,
+        "rows": 0,
+        "after_id": after_id,
+        "max_id": after_id,
+        "min_timestamp": None,
+        "max_timestamp": None,
+        "columns": [{"name": col, "type": kind} for col, kind in columns],
+    }
+
+    timestamp_index = (
+        [col for col, _ in columns].index(timestamp_column)
+        if timestamp_column
+        else None
+    )
+    with pq.ParquetWriter(
+        os.path.join(directory, filename), schema, compression=COMPRESSION
+    ) as writer:
+        for rows in iter_batches(model, columns, after_id, batch_size):
+            arrays = [
+                pa.array([row[i] for row in rows], type=field.type)
+                for i, field in enumerate(schema)
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+
+            entry["rows"] += len(rows)
+            entry["max_id"] = rows[-1][0]
+            if timestamp_index is not None:
+                stamps = [row[timestamp_index] for row in rows if row[timestamp_index]]
+                if stamps:
+                    low, high = min(stamps).isoformat(), max(stamps).isoformat()
+                    if entry["min_timestamp"] is None or low < entry["min_timestamp"]:
+                        entry["min_timestamp"] = low
+                    if entry["max_timestamp"] is None or high > entry["max_timestamp"]:
+                        entry["max_timestamp"] = high
+    return entry
+
+
+def export_attempt_data(full=False, batch_size=50000):
+    """
+    Export Score, Result and per-question answer rows to zstd-compressed Parquet.
+
+    Each run writes a directory under exports/analytics holding one file per
+    table and a manifest.json describing the files, row counts, id ranges and
+    timestamp ranges. Runs are incremental: only rows with an id above the
+    previous run's watermark are exported, unless `full` is set. Rows are read
+    with keyset pagination, `batch_size` at a time, so memory stays bounded.
+    Returns the manifest.
+    """
+    require_pyarrow()
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    watermarks = {} if full else load_watermarks()
+
+    run_id = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    directory = os.path.join(EXPORT_DIR, run_id)
+    os.makedirs(directory)
+
+    tables = {
+        name: export_table(name, directory, watermarks.get(name, 0), batch_size)
+        for name in TABLES
+    }
+    manifest = {
+        "run_id": run_id,
+        "created_at": datetime.now().isoformat(),
+        "format": "parquet",
+        "compression": COMPRESSION,
+        "incremental": bool(watermarks),
+        "tables": tables,
+    }
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Only advance the watermarks once every file and the manifest are written
+    save_watermarks({name: entry["max_id"] for name, entry in tables.items()})
+    return manifest
+
+
+def _run_is_full(directory):
+    """True if the run in `directory` is a complete non-incremental export."""
+    try:
+        with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+            return not json.load(f)["incremental"]
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def prune_runs(max_age_seconds, export_dir=EXPORT_DIR):
+    """
+    Apply the retention policy to the analytics export runs.
+
+    Runs are incremental, so each one holds rows no other run has; removing
+    one before consumers ingest the next full run would lose those rows. A
+    run is therefore only removed once it is older than `max_age_seconds` and
+    a later full run (whose manifest says incremental=false) covers it. Runs
+    without a manifest never finished and did not advance the watermarks, so
+    they are removed once old enough.
+    """
+    if not os.path.isdir(export_dir):
+        return {"removed": 0, "freed_bytes": 0}
+
+    runs = sorted(
+        (entry.name, entry.path)
+        for entry in os.scandir(export_dir)
+        if entry.is_dir()
+    )
+    full_runs = [name for name, path in runs if _run_is_full(path)]
+    latest_full = full_runs[-1] if full_runs else None
+
+    now = time.time()
+    removed = freed = 0
+    for name, path in runs:
+        if now - os.path.getmtime(path) <= max_age_seconds:
+            continue
+        finished = os.path.exists(os.path.join(path, "manifest.json"))
+        if finished and (latest_full is None or name >= latest_full):
+            continue
+        size = sum(
+            os.path.getsize(os.path.join(root, filename))
+            for root, _, filenames in os.walk(path)
+            for filename in filenames
+        )
+        shutil.rmtree(path, ignore_errors=True)
+        removed += 1
+        freed += size
+    return {"removed": removed, "freed_bytes": freed}
@@ -0,0 +1,67 @@
+from collections import namedtuple
+
+from cache import LRUCache
+
+# Redis counter per user, bumped whenever their roles change or their tokens
+# must stop working; tokens carry the value they were issued with as "rv".
+KEY_PREFIX = "authz:role_version"
+
+# What admin views get instead of a User row: everything comes from the token
+TokenUser = namedtuple("TokenUser", "id email fullname roles")
+
+
+def role_version_key(user_id):
+    return f"{KEY_PREFIX}:{user_id}"
+
+
+class RoleVersions:
+    """
+    Current role version per user, read from Redis through a short TTL cache.
+
+    A demotion or revocation therefore reaches every app process within
+    `ttl` seconds without a Redis round trip on each request; `bump` clears
+    the local entry at once. Users never bumped are at version 0.
+    """
+
+    def __init__(self, redis_client, ttl=5, maxsize=10000):
+        self.redis = redis_client
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def current(self, user_id):
+        user_id = int(user_id)
+        return self.cache.get_or_load(
+            user_id, lambda: int(self.redis.get(role_version_key(user_id)) or 0)
+        )
+
+    def bump(self, user_id):
+        """Invalidate every token issued to the user so far. Returns the new version."""
+        user_id = int(user_id)
+        version = self.redis.incr(role_version_key(user_id))
+        self.cache.invalidate(user_id)
+        return version
+
+
+def token_claims(user, version):
+    """Additional claims for create_access_token: the user's roles and profile."""
+    return {
+        "roles": sorted(role.name for role in user.roles),
+        "rv": version,
+        "email": user.email,
+        "fullname": user.fullname,
+    }
+
+
+def token_user(identity, claims):
+    return TokenUser(
+        int(identity), claims.get("email"), claims.get("fullname"), claims["roles"]
+    )
+
+
+def is_revoked(role_versions, claims):
+    """
+    True for tokens issued before the user's latest role change, and for
+    tokens from before roles were carried in claims.
+    """
+    if "rv" not in claims or "roles" not in claims:
+        return True
+    return claims["rv"] < role_versions.current(claims["sub"])
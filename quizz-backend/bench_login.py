@@ -0,0 +1,66 @@
+"""
+Benchmark password verification throughput for logins.
+
+Measures bcrypt verifications per second (the cost that dominates a login)
+inline in one thread, then on the PasswordHasher process pool at 1..N
+workers with twice as many concurrent callers as workers, and reports
+logins/sec and logins/sec per core.
+
+    python bench_login.py [--rounds 12] [--logins 200] [--max-workers 4]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passwords import PasswordHasher, _hash
+
+SECRET = b"bench-password-hmac"
+
+
+def run_inline(hashed, logins):
+    hasher = PasswordHasher(workers=0, queue_depth=0)
+    started = time.perf_counter()
+    for _ in range(logins):
+        assert hasher.verify(SECRET, hashed)
+    return time.perf_counter() - started
+
+
+def run_pool(hashed, logins, workers):
+    hasher = PasswordHasher(workers=workers, queue_depth=workers * 2)
+    hasher.verify(SECRET, hashed)  # start the workers outside the timing
+    with ThreadPoolExecutor(max_workers=workers * 2) as callers:
+        started = time.perf_counter()
+        results = list(callers.map(lambda _: hasher.verify(SECRET, hashed), range(logins)))
+        elapsed = time.perf_counter() - started
+    hasher.shutdown()
+    assert all(results)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    hashed = _hash(SECRET, args.rounds)
+    print(f"bcrypt rounds={args.rounds}, {args.logins} logins per run\n")
+    print(f"{'mode':>10} {'workers':>8} {'total s':>9} {'logins/s':>10} {'per core':>9}")
+
+    elapsed = run_inline(hashed, args.logins)
+    rate = args.logins / elapsed
+    print(f"{'inline':>10} {1:>8} {elapsed:>9.2f} {rate:>10.1f} {rate:>9.1f}")
+
+    for workers in range(1, args.max_workers + 1):
+        elapsed = run_pool(hashed, args.logins, workers)
+        rate = args.logins / elapsed
+        print(
+            f"{'pool':>10} {workers:>8} {elapsed:>9.2f} {rate:>10.1f} "
+            f"{rate / workers:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
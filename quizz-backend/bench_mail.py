@@ -0,0 +1,118 @@
+"""
+Benchmark mail delivery for the report tasks.
+
+Compares the original one-connection-per-message path (`mail.send` per user)
+with the pooled batches in mail_delivery.py. Runs against a minimal SMTP sink
+started in-process on a free local port, so it needs no MailHog. Pass --port
+to send to an already running sink instead.
+
+    python bench_mail.py [--messages 2000] [--batch-size 100] [--port 1025]
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+from flask import Flask
+from flask_mail import Mail, Message
+from mail_delivery import deliver
+from mail_templates import DAILY_REMINDER_SUBJECT, DAILY_REMINDER_TEXT
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    """Accepts and discards every message; enough SMTP for smtplib."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        self.reply("220 sink ready")
+        in_data = False
+        for raw in self.rfile:
+            line = raw.rstrip(b"\r\n")
+            if in_data:
+                if line == b".":
+                    in_data = False
+                    self.server.received += 1
+                    self.reply("250 OK")
+                continue
+            command = line[:4].upper()
+            if command in (b"EHLO", b"HELO"):
+                self.reply("250 sink")
+            elif command == b"DATA":
+                in_data = True
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+            elif command == b"QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class SinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    received = 0
+
+
+def start_sink():
+    server = SinkServer(("127.0.0.1", 0), SinkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def create_app(port):
+    app = Flask(__name__)
+    app.config["MAIL_SERVER"] = "127.0.0.1"
+    app.config["MAIL_PORT"] = port
+    app.config["MAIL_DEFAULT_SENDER"] = "admin@quizz.com"
+    return app, Mail(app)
+
+
+def build_messages(count):
+    return (
+        Message(
+            subject=DAILY_REMINDER_SUBJECT,
+            recipients=[f"user{i}@quizz.com"],
+            body=DAILY_REMINDER_TEXT.render(fullname=f"User {i}"),
+        )
+        for i in range(count)
+    )
+
+
+def send_one_by_one(mail, messages):
+    started = time.perf_counter()
+    sent = 0
+    for message in messages:
+        mail.send(message)
+        sent += 1
+    elapsed = time.perf_counter() - started
+    return {"sent": sent, "messages_per_second": round(sent / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--port", type=int)
+    args = parser.parse_args()
+
+    sink = None if args.port else start_sink()
+    app, mail = create_app(args.port or sink.server_address[1])
+
+    with app.app_context():
+        baseline = send_one_by_one(mail, build_messages(args.messages))
+        pooled = deliver(mail, build_messages(args.messages), args.batch_size)
+
+    print(f"{'path':<14}{'sent':>8}{'failed':>8}{'conns':>8}{'msg/s':>10}")
+    print(f"{'per-message':<14}{baseline['sent']:>8}{0:>8}{baseline['sent']:>8}"
+          f"{baseline['messages_per_second']:>10}")
+    print(f"{'pooled':<14}{pooled['sent']:>8}{pooled['failed']:>8}"
+          f"{pooled['connections']:>8}{pooled['messages_per_second']:>10}")
+    if sink:
+        print(f"sink received {sink.received} messages")
+        sink.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Benchmark the quiz submission write path.
+
+Compares the original ORM path (one UserResponse row per question, each added
+to the session as an object) with the current path in submissions.py (Core
+INSERTs of the Result and Score rows plus one packed AttemptAnswers row per
+attempt), for quizzes of 10, 100 and 500 questions. Runs against a throwaway
+SQLite file so the numbers include real commits.
+
+    python bench_submit.py [--submissions 200]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from flask import Flask
+from models import Question, Quiz, Result, Score, User, UserResponse, db
+from submissions import grade_responses, load_answer_key, save_submission
+
+QUESTION_COUNTS = [10, 100, 500]
+
+
+def create_app(db_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
+    db.init_app(app)
+    return app
+
+
+def seed_quiz(num_questions):
+    quiz = Quiz(
+        date_of_quiz=date.today(),
+        duration_of_quiz=timedelta(minutes=30),
+        remarks=f"bench-{num_questions}",
+    )
+    db.session.add(quiz)
+    db.session.flush()
+    db.session.add_all(
+        Question(
+            quiz_id=quiz.id,
+            question_statement=f"Question {i}",
+            option1="a",
+            option2="b",
+            option3="c",
+            option4="d",
+            correct_option_id=random.randint(1, 4),
+        )
+        for i in range(num_questions)
+    )
+    user = User(email=f"bench{num_questions}@quizz.com", fullname="Bench User")
+    db.session.add(user)
+    db.session.commit()
+    return quiz.id, user.id
+
+
+def random_answers(question_ids):
+    return {
+        str(qid): random.randint(1, 4) for qid in question_ids if random.random() > 0.1
+    }
+
+
+def submit_orm(user_id, quiz_id, data):
+    """The original submission path: an ORM UserResponse object per question."""
+    questions = Question.query.filter_by(quiz_id=quiz_id).all()
+    correct, wrong, unattempted = 0, 0, 0
+
+    for q in questions:
+        selected = data.get(str(q.id))
+        if selected is None:
+            unattempted += 1
+            option_selected = -1
+        elif int(selected) == q.correct_option_id:
+            correct += 1
+            option_selected = int(selected)
+        else:
+            wrong += 1
+            option_selected = int(selected)
+
+        db.session.add(
+            UserResponse(
+                user_id=user_id,
+                quiz_id=quiz_id,
+                question_id=q.id,
+                option_selected=option_selected,
+            )
+        )
+
+    total_questions = len(questions)
+    score = (correct * 100) / total_questions if total_questions > 0 else 0
+    db.session.add(
+        Result(
+            user_id=user_id,
+            quiz_id=quiz_id,
+            score=score,
+            correct_answers=correct,
+            total_questions=total_questions,
+        )
+    )
+    db.session.add(
+        Score(
+            quiz_id=quiz_id,
+            user_id=user_id,
+            correct=correct,
+            wrong=wrong,
+            unattempted=unattempted,
+            total_score=int(score),
+            status="completed",
+        )
+    )
+    db.session.commit()
+
+
+def submit_packed(user_id, quiz_id, data):
+    """The current path used by submit_quiz: one packed AttemptAnswers row."""
+    answer_key = load_answer_key(quiz_id)
+    rows, correct, wrong, unattempted = grade_responses(answer_key, data)
+    save_submission(user_id, quiz_id, rows, correct, wrong, unattempted)
+    db.session.commit()
+
+
+def run(submit, user_id, quiz_id, payloads):
+    started = time.perf_counter()
+    for data in payloads:
+        submit(user_id, quiz_id, data)
+        db.session.expunge_all()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--submissions", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(os.path.join(tmp, "bench.db"))
+        with app.app_context():
+            db.create_all()
+
+            print(f"{'questions':>10} {'path':>6} {'total s':>9} {'subs/s':>9} {'ms/sub':>8}")
+            for num_questions in QUESTION_COUNTS:
+                quiz_id, user_id = seed_quiz(num_questions)
+                question_ids = [
+                    qid for (qid,) in db.session.query(Question.id).filter_by(quiz_id=quiz_id)
+                ]
+                payloads = [random_answers(question_ids) for _ in range(args.submissions)]
+
+                timings = {}
+                for name, submit in (("orm", submit_orm), ("packed", submit_packed)):
+                    timings[name] = run(submit, user_id, quiz_id, payloads)
+                    elapsed = timings[name]
+                    print(
+                        f"{num_questions:>10} {name:>6} {elapsed:>9.3f} "
+                        f"{args.submissions / elapsed:>9.1f} "
+                        f"{elapsed * 1000 / args.submissions:>8.2f}"
+                    )
+                print(f"{'':>10} speedup x{timings['orm'] / timings['packed']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Small thread-safe in-process LRU cache with hit/miss counters.
+
+    Each worker process keeps its own copy, so writers must call `invalidate`
+    for every key they change. With `ttl` (seconds) entries also expire on
+    their own, for values other processes may change.
+    """
+
+    def __init__(self, maxsize=128, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._expires = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data and self.ttl is not None:
+                if self._expires[key] <= time.monotonic():
+                    del self._data[key]
+                    del self._expires[key]
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if self.ttl is not None:
+                self._expires[key] = time.monotonic() + self.ttl
+            while len(self._data) > self.maxsize:
+                evicted, _ = self._data.popitem(last=False)
+                self._expires.pop(evicted, None)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for `key`, calling `loader()` on a miss.
+
+        Loader results of None are returned but not cached.
+        """
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class SharedVersions:
+    """
+    Named version counters in Redis, read through a short TTL cache.
+
+    Per-process caches put the version in their keys; `bump` in any process
+    makes every other process's entries unreachable within `ttl` seconds.
+    Counters never bumped are at version 0. Redis errors propagate.
+    """
+
+    def __init__(self, redis_client, prefix, ttl=2, maxsize=10000):
+        self.redis = redis_client
+        self.prefix = prefix
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def current(self, name):
+        return self.cache.get_or_load(
+            name, lambda: int(self.redis.get(f"{self.prefix}:{name}") or 0)
+        )
+
+    def bump(self, name):
+        version = self.redis.incr(f"{self.prefix}:{name}")
+        self.cache.invalidate(name)
+        return version
@@ -0,0 +1,72 @@
+from models import Chapter, Question, Quiz, Subject, db
+
+
+def build_catalog():
+    """
+    Build the Subject -> Chapter -> Quiz tree with question counts.
+
+    Uses four flat queries (subjects, chapters, quizzes, one GROUP BY for
+    question counts) regardless of catalog size, then stitches the tree
+    together in memory.
+    """
+    question_counts = dict(
+        db.session.query(Question.quiz_id, db.func.count(Question.id))
+        .group_by(Question.quiz_id)
+        .all()
+    )
+
+    quizzes_by_chapter = {}
+    for quiz in db.session.query(
+        Quiz.id,
+        Quiz.chapterid,
+        Quiz.date_of_quiz,
+        Quiz.duration_of_quiz,
+        Quiz.remarks,
+    ).order_by(Quiz.id):
+        quizzes_by_chapter.setdefault(quiz.chapterid, []).append(
+            {
+                "id": quiz.id,
+                "date_of_quiz": (
+                    quiz.date_of_quiz.strftime("%Y-%m-%d") if quiz.date_of_quiz else None
+                ),
+                "duration_of_quiz": (
+                    int(quiz.duration_of_quiz.total_seconds() / 60)
+                    if quiz.duration_of_quiz
+                    else None
+                ),
+                "remarks": quiz.remarks,
+                "question_count": question_counts.get(quiz.id, 0),
+            }
+        )
+
+    chapters_by_subject = {}
+    for chapter in db.session.query(
+        Chapter.id, Chapter.subjectid, Chapter.name, Chapter.description
+    ).order_by(Chapter.id):
+        quizzes = quizzes_by_chapter.get(chapter.id, [])
+        chapters_by_subject.setdefault(chapter.subjectid, []).append(
+            {
+                "id": chapter.id,
+                "name": chapter.name,
+                "description": chapter.description,
+                "question_count": sum(q["question_count"] for q in quizzes),
+                "quizzes": quizzes,
+            }
+        )
+
+    subjects = []
+    for subject in db.session.query(
+        Subject.id, Subject.name, Subject.description
+    ).order_by(Subject.id):
+        chapters = chapters_by_subject.get(subject.id, [])
+        subjects.append(
+            {
+                "id": subject.id,
+                "name": subject.name,
+                "description": subject.description,
+                "question_count": sum(c["question_count"] for c in chapters),
+                "chapters": chapters,
+            }
+        )
+
+    return {"subjects": subjects}
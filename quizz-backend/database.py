@@ -0,0 +1,91 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# rollups.upsert only knows the ON CONFLICT dialects of these two
+SUPPORTED_BACKENDS = ("sqlite", "postgresql")
+
+
+def check_backend(uri):
+    """Raise ValueError for a database the upsert-based writes cannot run on."""
+    backend = make_url(uri).get_backend_name()
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(
+            f"Unsupported database backend {backend!r}; "
+            f"use one of {', '.join(SUPPORTED_BACKENDS)}"
+        )
+
+
+def is_sqlite(uri):
+    return make_url(uri).get_backend_name() == "sqlite"
+
+
+def is_memory_sqlite(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(uri, pool_size, max_overflow, pool_timeout, pool_recycle):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for `uri`.
+
+    Server databases get a bounded QueuePool that checks connections before
+    use and recycles them before the server drops idle ones. File SQLite
+    keeps SQLAlchemy's QueuePool too, sized the same way; in-memory SQLite
+    keeps its default single-connection pool.
+    """
+    if is_memory_sqlite(uri):
+        return {}
+    options = {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": pool_timeout,
+    }
+    if not is_sqlite(uri):
+        options["pool_pre_ping"] = True
+        options["pool_recycle"] = pool_recycle
+    return options
+
+
+def install_sqlite_pragmas(engine, busy_timeout_ms, mmap_size):
+    """
+    Set the SQLite pragmas on every new connection of `engine`.
+
+    WAL lets readers run alongside the single writer instead of blocking
+    behind it, busy_timeout makes a second writer wait for the lock rather
+    than fail with "database is locked", synchronous=NORMAL is durable under
+    WAL except for the last commits on power loss, and mmap reads pages
+    without a copy through the page cache. No-op for other databases.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        cursor.close()
+
+
+SQLITE_REPORTED_PRAGMAS = ("journal_mode", "busy_timeout", "synchronous", "mmap_size")
+
+
+def pool_stats(engine):
+    """Pool occupancy for `engine`, plus the effective pragmas on SQLite."""
+    pool = engine.pool
+    stats = {"dialect": engine.dialect.name, "pool": type(pool).__name__}
+    # Only QueuePool tracks a size and overflow
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    stats["status"] = pool.status()
+
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            stats["pragmas"] = {
+                name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+                for name in SQLITE_REPORTED_PRAGMAS
+            }
+    return stats
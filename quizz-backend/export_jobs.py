@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import time
+
+# How long a job record is remembered; matches Celery's default result expiry
+JOB_TTL_SECONDS = 24 * 3600
+LOCK_SECONDS = 10
+
+# Celery states (plus our custom PROGRESS) meaning the task has not finished
+IN_FLIGHT_STATES = {"PENDING", "RECEIVED", "STARTED", "RETRY", "PROGRESS"}
+# Celery also reports PENDING for ids it has never seen (a lost message, or a
+# worker that died before reporting), so a job only counts as queued for this
+# long after it was started
+PENDING_TIMEOUT_SECONDS = 300
+
+
+def job_key(kind, params):
+    digest = hashlib.sha256(
+        json.dumps(params, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:16]
+    return f"export:{kind}:{digest}"
+
+
+def output_exists(result, exports_folder):
+    if not isinstance(result, dict) or result.get("status") != "completed":
+        return False
+    if "url" not in result:
+        return True
+    return os.path.isfile(os.path.join(exports_folder, os.path.basename(result["url"])))
+
+
+def _existing_job(
+    redis_client, celery, key, watermark, exports_folder, pending_timeout
+):
+    raw = redis_client.get(key)
+    if not raw:
+        return None
+    job = json.loads(raw)
+    task = celery.AsyncResult(job["task_id"])
+    if task.state == "PENDING":
+        if time.time() - job.get("queued_at", 0) < pending_timeout:
+            return job["task_id"], "joined"
+        return None
+    if task.state in IN_FLIGHT_STATES:
+        return job["task_id"], "joined"
+    if (
+        watermark is not None
+        and task.state == "SUCCESS"
+        and job.get("watermark") == watermark
+        and output_exists(task.result, exports_folder)
+    ):
+        return job["task_id"], "reused"
+    return None
+
+
+def single_flight(
+    redis_client,
+    celery,
+    kind,
+    params,
+    start,
+    watermark=None,
+    exports_folder="exports",
+    pending_timeout=PENDING_TIMEOUT_SECONDS,
+):
+    """
+    Start an export job unless an equivalent one can be shared.
+
+    Jobs are keyed by `kind` and `params`. A request for a job that is still
+    running joins it; one still PENDING `pending_timeout` seconds after it was
+    started is presumed lost and replaced. A finished job is reused when its
+    recorded `watermark` (a JSON-serializable snapshot of the source data,
+    e.g. max ids) still matches and its file has not been pruned; pass
+    watermark=None to never reuse. Otherwise `start()` is called and must
+    return the AsyncResult.
+
+    Returns (task_id, "joined" | "reused" | "started").
+    """
+    key = job_key(kind, params)
+    existing = _existing_job(
+        redis_client, celery, key, watermark, exports_folder, pending_timeout
+    )
+    if existing:
+        return existing
+
+    lock_key = f"{key}:lock"
+    if not redis_client.set(lock_key, "1", nx=True, ex=LOCK_SECONDS):
+        # Another request is starting this job; wait for it to record the id
+        deadline = time.monotonic() + LOCK_SECONDS
+        while redis_client.exists(lock_key) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        existing = _existing_job(
+        redis_client, celery, key, watermark, exports_folder, pending_timeout
+    )
+        if existing:
+            return existing
+
+    try:
+        task = start()
+        redis_client.set(
+            key,
+            json.dumps(
+                {"task_id": task.id, "watermark": watermark, "queued_at": time.time()}
+            ),
+            ex=JOB_TTL_SECONDS,
+        )
+    finally:
+        redis_client.delete(lock_key)
+    return task.id, "started"
+
+
+def prune_exports(folder, max_age_seconds, max_bytes, keep=(), prefix="user_performance_"):
+    """
+    Apply the retention policy to export files directly under `folder`.
+
+    Files whose name starts with `prefix` are removed when older than
+    `max_age_seconds`, then oldest first until the remaining ones fit in
+    `max_bytes`. File names in `keep` are never removed.
+    """
+    if not os.path.isdir(folder):
+        return {"removed": 0, "freed_bytes": 0, "remaining_bytes": 0}
+
+    files = []
+    for entry in os.scandir(folder):
+        if entry.is_file() and entry.name.startswith(prefix):
+            stat = entry.stat()
+            files.append((stat.st_mtime, stat.st_size, entry.name, entry.path))
+    files.sort()
+
+    now = time.time()
+    total = sum(size for _, size, _, _ in files)
+    removed = freed = 0
+    for mtime, size, name, path in files:
+        if name in keep:
+            continue
+        if now - mtime <= max_age_seconds and total <= max_bytes:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+        freed += size
+
+    return {"removed": removed, "freed_bytes": freed, "remaining_bytes": total}
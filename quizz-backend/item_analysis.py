@@ -0,0 +1,143 @@
+from datetime import datetime
+
+from models import IST, AttemptAnswers, db
+from sqlalchemy import select
+from submissions import load_answer_key
+
+try:
+    import numpy as np
+except ImportError:  # only the item analysis needs it
+    np = None
+
+OPTIONS = (1, 2, 3, 4)
+
+# Cell value for a question that did not exist yet when the attempt was made
+NOT_PRESENTED = -2
+
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("numpy is required for item analysis")
+
+
+def load_response_matrix(quiz_id, question_ids):
+    """
+    Load every attempt at a quiz into an attempts x questions matrix.
+
+    The packed AttemptAnswers arrays are concatenated and decoded in one go.
+    Cells hold the selected option, -1 for a skipped question and
+    NOT_PRESENTED where the question was added after the attempt. Answers to
+    deleted questions are dropped.
+    """
+    attempts = db.session.execute(
+        select(AttemptAnswers.question_ids, AttemptAnswers.answers)
+        .where(AttemptAnswers.quiz_id == quiz_id)
+        .order_by(AttemptAnswers.id)
+    ).all()
+
+    columns = len(question_ids)
+    matrix = np.full((len(attempts), columns), NOT_PRESENTED, dtype=np.int8)
+    if not attempts:
+        return matrix, 0
+
+    questions = np.frombuffer(b"".join(a.question_ids for a in attempts), dtype="<i4")
+    selected = np.frombuffer(b"".join(a.answers for a in attempts), dtype=np.int8)
+    attempt = np.repeat(np.arange(len(attempts)), [len(a.answers) for a in attempts])
+
+    column = np.searchsorted(question_ids, questions)
+    known = column < columns
+    known[known] = question_ids[column[known]] == questions[known]
+
+    matrix[attempt[known], column[known]] = np.maximum(selected[known], -1)
+    return matrix, len(selected)
+
+
+def safe_ratio(numerator, denominator):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / np.maximum(denominator, 1), np.nan)
+
+
+def point_biserial(correct, presented):
+    """
+    Corrected item-total correlation for every question at once.
+
+    Each item is correlated with the attempt's score on the *other* items,
+    over the attempts the item was presented in. NaN where either side has
+    no variance.
+    """
+    x = correct.astype(np.float64)
+    mask = presented.astype(np.float64)
+    n = mask.sum(axis=0)
+
+    rest = x.sum(axis=1, keepdims=True) - x
+    mean_x = safe_ratio((x * mask).sum(axis=0), n)
+    mean_rest = safe_ratio((rest * mask).sum(axis=0), n)
+
+    dx = (x - mean_x) * mask
+    drest = (rest - mean_rest) * mask
+    cov = (dx * drest).sum(axis=0)
+    spread = np.sqrt((dx * dx).sum(axis=0) * (drest * drest).sum(axis=0))
+    return safe_ratio(cov, spread)
+
+
+def rounded(values, digits=4):
+    return [None if np.isnan(v) else round(float(v), digits) for v in values]
+
+
+def analyze_quiz(quiz_id):
+    """
+    Item statistics for every question of a quiz, computed column-wise.
+
+    Per question: p_value (share of presented attempts answered correctly),
+    discrimination (point-biserial, see above), skip_rate and the share of
+    answers picking each option. Returns None for a quiz with no questions.
+    """
+    require_numpy()
+    answer_key = load_answer_key(quiz_id)
+    if answer_key is None:
+        return None
+
+    question_ids = np.array(answer_key[0], dtype=np.int64)
+    correct_options = np.array(answer_key[1], dtype=np.int8)
+    matrix, responses = load_response_matrix(quiz_id, question_ids)
+
+    presented = matrix != NOT_PRESENTED
+    answered = matrix >= 1
+    correct = presented & (matrix == correct_options)
+
+    presented_count = presented.sum(axis=0)
+    answered_count = answered.sum(axis=0)
+    p_values = safe_ratio(correct.sum(axis=0), presented_count)
+    skip_rates = safe_ratio(presented_count - answered_count, presented_count)
+    discrimination = point_biserial(correct, presented)
+    option_shares = {
+        option: rounded(safe_ratio((matrix == option).sum(axis=0), answered_count))
+        for option in OPTIONS
+    }
+
+    p_values, skip_rates, discrimination = (
+        rounded(p_values),
+        rounded(skip_rates),
+        rounded(discrimination),
+    )
+    return {
+        "quiz_id": quiz_id,
+        "attempts": int(matrix.shape[0]),
+        "responses": responses,
+        "computed_at": datetime.now(IST).isoformat(),
+        "questions": [
+            {
+                "question_id": int(question_id),
+                "correct_option": int(correct_options[i]),
+                "presented": int(presented_count[i]),
+                "answered": int(answered_count[i]),
+                "p_value": p_values[i],
+                "discrimination": discrimination[i],
+                "skip_rate": skip_rates[i],
+                "options": {
+                    str(option): option_shares[option][i] for option in OPTIONS
+                },
+            }
+            for i, question_id in enumerate(question_ids)
+        ],
+    }
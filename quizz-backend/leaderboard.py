@@ -0,0 +1,132 @@
+from models import Quiz, Result, db
+from sqlalchemy import func, select
+
+# Sorted sets, member = user id:
+#   leaderboard:quiz:<id>     score = the user's best score on the quiz
+#   leaderboard:subject:<id>  score = sum of the user's best quiz scores
+KEY_PREFIX = "leaderboard"
+
+# Keep the quiz best score and the subject total in step atomically: only an
+# improvement on the quiz best moves the subject total, by the difference.
+RECORD_SCRIPT = """
+local old = redis.call('ZSCORE', KEYS[1], ARGV[1])
+local score = tonumber(ARGV[2])
+if old and tonumber(old) >= score then
+    return 0
+end
+redis.call('ZADD', KEYS[1], score, ARGV[1])
+if KEYS[2] then
+    redis.call('ZINCRBY', KEYS[2], score - (tonumber(old) or 0), ARGV[1])
+end
+return 1
+"""
+
+
+def board_key(kind, board_id):
+    return f"{KEY_PREFIX}:{kind}:{board_id}"
+
+
+def record_score(redis_client, user_id, quiz_id, subject_id, score):
+    """Fold a submission into the quiz and subject boards. True if it was a new best."""
+    keys = [board_key("quiz", quiz_id)]
+    if subject_id is not None:
+        keys.append(board_key("subject", subject_id))
+    return bool(
+        redis_client.eval(RECORD_SCRIPT, len(keys), *keys, user_id, float(score))
+    )
+
+
+def standing(redis_client, kind, board_id, user_id):
+    """
+    The user's place on a board, or None if they are not on it.
+
+    `rank` is competition style (ties share the better rank) and
+    `percentile` is the share of other players with a lower score.
+    """
+    key = board_key(kind, board_id)
+    score = redis_client.zscore(key, user_id)
+    if score is None:
+        return None
+
+    pipe = redis_client.pipeline()
+    pipe.zcard(key)
+    pipe.zcount(key, f"({score}", "+inf")
+    pipe.zcount(key, "-inf", f"({score}")
+    total, above, below = pipe.execute()
+    return {
+        "score": score,
+        "rank": above + 1,
+        "total": total,
+        "percentile": round(below * 100 / (total - 1), 1) if total > 1 else 100.0,
+    }
+
+
+def top(redis_client, kind, board_id, offset, limit):
+    """One page of a board, best first, as (user_id, score, rank) tuples."""
+    key = board_key(kind, board_id)
+    entries = redis_client.zrevrange(key, offset, offset + limit - 1, withscores=True)
+    if not entries:
+        return [], redis_client.zcard(key)
+
+    pipe = redis_client.pipeline()
+    pipe.zcard(key)
+    pipe.zcount(key, f"({entries[0][1]}", "+inf")
+    total, above = pipe.execute()
+
+    page = []
+    rank = above + 1
+    for position, (member, score) in enumerate(entries):
+        if position and score < entries[position - 1][1]:
+            rank = offset + position + 1
+        page.append((int(member), score, rank))
+    return page, total
+
+
+def rebuild_leaderboards(redis_client):
+    """
+    Recreate every board from the Result table.
+
+    Each board is built under a temporary key and renamed over the live one,
+    so readers never see a half-built board; boards with no results left are
+    deleted. Returns the number of quiz and subject boards written.
+    """
+    best = (
+        select(
+            Result.user_id,
+            Result.quiz_id,
+            func.max(Result.score).label("best"),
+        )
+        .where(Result.user_id.isnot(None), Result.quiz_id.isnot(None))
+        .group_by(Result.user_id, Result.quiz_id)
+        .subquery()
+    )
+    rows = db.session.execute(
+        select(best.c.user_id, best.c.quiz_id, Quiz.subjectid, best.c.best).join(
+            Quiz, Quiz.id == best.c.quiz_id
+        )
+    )
+
+    boards = {}
+    for user_id, quiz_id, subject_id, score in rows:
+        quiz_board = boards.setdefault(board_key("quiz", quiz_id), {})
+        quiz_board[user_id] = score
+        if subject_id is not None:
+            subject_board = boards.setdefault(board_key("subject", subject_id), {})
+            subject_board[user_id] = subject_board.get(user_id, 0) + score
+
+    stale = set(redis_client.scan_iter(f"{KEY_PREFIX}:quiz:*"))
+    stale |= set(redis_client.scan_iter(f"{KEY_PREFIX}:subject:*"))
+
+    pipe = redis_client.pipeline()
+    for key, members in boards.items():
+        tmp_key = f"{KEY_PREFIX}:rebuild:{key}"
+        pipe.delete(tmp_key)
+        pipe.zadd(tmp_key, members)
+        pipe.rename(tmp_key, key)
+        stale.discard(key)
+    if stale:
+        pipe.delete(*stale)
+    pipe.execute()
+
+    quizzes = sum(1 for key in boards if key.startswith(f"{KEY_PREFIX}:quiz:"))
+    return quizzes, len(boards) - quizzes
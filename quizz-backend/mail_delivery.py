@@ -0,0 +1,112 @@
+import smtplib
+import time
+
+from flask_mail import BadHeaderError
+
+# Errors that only affect one message; the connection stays usable
+MESSAGE_ERRORS = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+    BadHeaderError,
+    AssertionError,
+)
+
+# How many failures to keep in the result, to keep task results small
+MAX_REPORTED_ERRORS = 20
+
+
+class DeliveryStats:
+    def __init__(self, on_result=None):
+        self.on_result = on_result
+        self.sent = 0
+        self.failed = 0
+        self.connections = 0
+        self.reconnects = 0
+        self.errors = []
+        self._started = time.perf_counter()
+
+    def ok(self, message):
+        self.sent += 1
+        if self.on_result:
+            self.on_result(message, None)
+
+    def fail(self, message, error):
+        self.failed += 1
+        if self.on_result:
+            self.on_result(message, error)
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(
+                {"recipients": sorted(message.send_to), "error": str(error)}
+            )
+
+    def as_dict(self):
+        elapsed = time.perf_counter() - self._started
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "connections": self.connections,
+            "reconnects": self.reconnects,
+            "elapsed_seconds": round(elapsed, 3),
+            "messages_per_second": round(self.sent / elapsed, 1) if elapsed else None,
+            "errors": self.errors,
+        }
+
+
+def send_batch(mail, batch, stats, max_attempts=3):
+    """
+    Send `batch` over one SMTP connection, reconnecting if it drops.
+
+    A message refused by the server is counted as failed and the batch moves
+    on. A connection-level error reconnects and resumes at the message that
+    failed; after `max_attempts` consecutive connection errors on the same
+    message it is counted as failed too.
+    """
+    position = 0
+    attempts = 0
+    while position < len(batch):
+        try:
+            with mail.connect() as conn:
+                stats.connections += 1
+                while position < len(batch):
+                    try:
+                        conn.send(batch[position])
+                        stats.ok(batch[position])
+                    except MESSAGE_ERRORS as e:
+                        stats.fail(batch[position], e)
+                    position += 1
+                    attempts = 0
+        except OSError as e:
+            # smtplib errors are OSErrors too; anything left here means the
+            # connection is gone (or could not be opened)
+            if position >= len(batch):
+                break  # only QUIT failed, everything was delivered
+            attempts += 1
+            if attempts >= max_attempts:
+                stats.fail(batch[position], e)
+                position += 1
+                attempts = 0
+            else:
+                stats.reconnects += 1
+
+
+def deliver(mail, messages, batch_size=100, max_attempts=3, on_result=None):
+    """
+    Send an iterable of flask_mail Messages, `batch_size` per SMTP connection.
+
+    `messages` may be a generator, so callers can build messages lazily while
+    rows stream from the database. Returns delivery stats (sent, failed,
+    connections, reconnects, elapsed_seconds, messages_per_second and the
+    first few errors). `on_result(message, error)` is called after every
+    message, with error None on success.
+    """
+    stats = DeliveryStats(on_result)
+    batch = []
+    for message in messages:
+        batch.append(message)
+        if len(batch) >= batch_size:
+            send_batch(mail, batch, stats, max_attempts)
+            batch = []
+    if batch:
+        send_batch(mail, batch, stats, max_attempts)
+    return stats.as_dict()
@@ -0,0 +1,67 @@
+from jinja2 import Environment
+
+# Compiled once at import; tasks only render. HTML output is autoescaped so
+# user-supplied names cannot inject markup.
+_html = Environment(autoescape=True, trim_blocks=True, lstrip_blocks=True)
+_text = Environment(autoescape=False, keep_trailing_newline=True)
+
+MONTHLY_REPORT_SUBJECT = _text.from_string("Your Quiz Master Report for {{ month_name }}")
+
+MONTHLY_REPORT_HTML = _html.from_string(
+    """
+<html>
+<head>
+    <style>
+        body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Helvetica, Arial, sans-serif; line-height: 1.6; color: #333; }
+        .container { padding: 25px; border: 1px solid #e0e0e0; border-radius: 8px; max-width: 600px; margin: 20px auto; background-color: #f9f9f9; }
+        .header { font-size: 24px; color: #2c3e50; margin-bottom: 20px; }
+        .footer { margin-top: 25px; font-size: 12px; color: #888; text-align: center; }
+        ul { list-style-type: none; padding-left: 0; }
+        li { background: #ffffff; margin-bottom: 8px; padding: 12px; border-radius: 5px; border-left: 4px solid #3498db; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <p class="header">Your Monthly Report for {{ month_name }}</p>
+        <p>Hi {{ fullname or "there" }},</p>
+        <p>Here is your quiz activity summary from last month:</p>
+        <ul>
+            <li><strong>Quizzes attempted:</strong> {{ attempts }}</li>
+            <li><strong>Best score:</strong> {{ best_score if best_score is not none else "N/A" }}</li>
+        </ul>
+        <p>Your average score for the month was: <strong>{{ "%.2f"|format(avg_score) }}</strong></p>
+        <p>Keep up the great work!</p>
+        <div class="footer">
+            <p>Regards,<br>The Quiz Master Team</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+)
+
+MONTHLY_REPORT_TEXT = _text.from_string(
+    """Hi {{ fullname or "User" }},
+
+Here is your activity report for {{ month_name }}:
+- Quizzes attempted: {{ attempts }}
+- Best score: {{ best_score if best_score is not none else "N/A" }}
+
+Average Score: {{ "%.2f"|format(avg_score) }}
+
+Keep up the great work!
+
+Regards,
+The Quiz Master Team"""
+)
+
+DAILY_REMINDER_SUBJECT = "We miss you at Quiz Master!"
+
+DAILY_REMINDER_TEXT = _text.from_string(
+    """Hi {{ fullname or "User" }},
+
+We miss you at Quiz Master! Come back and test your knowledge with our new quizzes.
+
+Regards,
+The Quiz Master Team"""
+)
@@ -0,0 +1,169 @@
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+from attempt_answers import pack_user_responses
+from models import IST
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    inspect,
+    insert,
+    select,
+    text,
+)
+
+# Applied migrations, one row per version. Kept out of db.metadata so
+# create_all never creates it ahead of the first upgrade.
+metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+# pg_advisory_lock key for schema changes ("QUIZ")
+ADVISORY_LOCK_KEY = 0x5155495A
+
+
+@contextmanager
+def schema_lock(engine, timeout=600):
+    """
+    Hold a cross-process lock while creating or migrating the schema.
+
+    Every web worker, Celery worker and CLI call initialises the database
+    when it imports the app, so they take turns here and each later one
+    finds the work already done. On SQLite the lock is an exclusive
+    transaction on a side file next to the database (so it never blocks the
+    database itself); on PostgreSQL a session advisory lock. Waiters give up
+    after `timeout` seconds on SQLite. Not reentrant.
+    """
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(
+                text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY}
+            )
+            try:
+                yield
+            finally:
+                conn.execute(
+                    text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY}
+                )
+                conn.commit()
+        return
+
+    path = engine.url.database
+    if not path or path == ":memory:":
+        yield
+        return
+
+    lock = sqlite3.connect(f"{path}-schema-lock", timeout=timeout, isolation_level=None)
+    try:
+        lock.execute("BEGIN EXCLUSIVE")
+        try:
+            yield
+        finally:
+            lock.execute("ROLLBACK")
+    finally:
+        lock.close()
+
+
+def create_index(conn, name, table, *columns):
+    """CREATE INDEX unless an index of that name already exists on `table`."""
+    if name in {index["name"] for index in inspect(conn).get_indexes(table)}:
+        return
+    conn.execute(text(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"))
+
+
+# ------------------- Migrations ---------------------
+# Each takes a Connection inside the migration's transaction and must be safe
+# to run on a database that already has the change (older databases had some
+# of these indexes created ad hoc at startup).
+def foreign_key_indexes(conn):
+    create_index(conn, "ix_chapter_subjectid", "chapter", "subjectid")
+    create_index(conn, "ix_quiz_chapterid", "quiz", "chapterid")
+    create_index(conn, "ix_quiz_subjectid", "quiz", "subjectid")
+    create_index(
+        conn, "ix_email_outbox_status_available", "email_outbox", "status", "available_at"
+    )
+
+
+def hot_path_indexes(conn):
+    create_index(conn, "ix_question_quiz_id", "question", "quiz_id")
+    create_index(conn, "ix_user_response_user_quiz", "user_response", "user_id", "quiz_id")
+    create_index(conn, "ix_score_user_id", "score", "user_id")
+    create_index(conn, "ix_score_timestamp_of_attempt", "score", "timestamp_of_attempt")
+    create_index(conn, "ix_result_quiz_id", "result", "quiz_id")
+
+
+def packed_attempt_answers(conn):
+    # The attempt_answers table itself comes from create_all
+    pack_user_responses(conn)
+
+
+# (version, description, function), in the order they are applied
+MIGRATIONS = [
+    (1, "Index catalog foreign keys and the email outbox queue", foreign_key_indexes),
+    (2, "Index question, response, score and result hot paths", hot_path_indexes),
+    (3, "Copy user_response rows into attempt_answers", packed_attempt_answers),
+]
+
+
+def head():
+    return MIGRATIONS[-1][0]
+
+
+def applied_versions(engine):
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(schema_migrations.name):
+            return set()
+        return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def _record(conn, version, description):
+    conn.execute(
+        insert(schema_migrations).values(
+            version=version, description=description, applied_at=datetime.now(IST)
+        )
+    )
+
+
+def upgrade(engine, fresh=False):
+    """
+    Apply every pending migration, each in its own transaction with its
+    version row, and return the versions applied.
+
+    init_database runs create_all first, so new tables come from the models
+    and migrations only carry changes to tables that already exist. On a
+    `fresh` database create_all has just built the current schema, so the
+    migrations are recorded without running. Callers hold schema_lock.
+    """
+    metadata.create_all(engine)
+    done = applied_versions(engine)
+
+    applied = []
+    for version, description, migrate in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            if not fresh:
+                migrate(conn)
+            _record(conn, version, description)
+        applied.append(version)
+    return applied
+
+
+def status(engine):
+    """[(version, description, applied)] for every known migration."""
+    done = applied_versions(engine)
+    return [
+        (version, description, version in done)
+        for version, description, _ in MIGRATIONS
+    ]
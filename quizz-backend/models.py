@@ -64,8 +64,17 @@ class User(db.Model, UserMixin):
     responses = db.relationship(
         "UserResponse", backref="user", cascade="all, delete-orphan"
     )
+    attempt_answers = db.relationship(
+        "AttemptAnswers", backref="user", cascade="all, delete-orphan"
+    )
     scores = db.relationship("Score", backref="user", cascade="all, delete-orphan")
     results = db.relationship("Result", backref="user", cascade="all, delete-orphan")
+    stats = db.relationship(
+        "UserStats", backref="user", uselist=False, cascade="all, delete-orphan"
+    )
+    monthly_stats = db.relationship(
+        "UserMonthlyStats", backref="user", cascade="all, delete-orphan"
+    )
 
 
 # ------------------- Subject Table -------------------
@@ -89,7 +98,10 @@ class Chapter(db.Model):
     description = db.Column(db.Text)
 
     subjectid = db.Column(
-        db.Integer, db.ForeignKey("subject.id", ondelete="CASCADE"), nullable=True
+        db.Integer,
+        db.ForeignKey("subject.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
     )
     quizzes = db.relationship("Quiz", backref="chapter", cascade="all, delete-orphan")
 
@@ -99,12 +111,18 @@ class Quiz(db.Model):
     id = db.Column(db.Integer, primary_key=True)
 
     chapterid = db.Column(
-        db.Integer, db.ForeignKey("chapter.id", ondelete="CASCADE"), nullable=True
+        db.Integer,
+        db.ForeignKey("chapter.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
     )
     chapter_name_search_term = db.Column(db.String(255), nullable=True)
 
     subjectid = db.Column(
-        db.Integer, db.ForeignKey("subject.id", ondelete="CASCADE"), nullable=True
+        db.Integer,
+        db.ForeignKey("subject.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
     )
     subject_name_search_term = db.Column(db.String(255), nullable=True)
 
@@ -118,8 +136,14 @@ class Quiz(db.Model):
     responses = db.relationship(
         "UserResponse", backref="quiz", cascade="all, delete-orphan"
     )
+    attempt_answers = db.relationship(
+        "AttemptAnswers", backref="quiz", cascade="all, delete-orphan"
+    )
     scores = db.relationship("Score", backref="quiz", cascade="all, delete-orphan")
     results = db.relationship("Result", backref="quiz", cascade="all, delete-orphan")
+    stats = db.relationship(
+        "QuizStats", backref="quiz", uselist=False, cascade="all, delete-orphan"
+    )
 
 
 # ------------------- Question Table -------------------
@@ -127,7 +151,10 @@ class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
 
     quiz_id = db.Column(
-        db.Integer, db.ForeignKey("quiz.id", ondelete="CASCADE"), nullable=True
+        db.Integer,
+        db.ForeignKey("quiz.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
     )
 
     question_statement = db.Column(db.Text, nullable=True)
@@ -145,6 +172,11 @@ class Question(db.Model):
 
 
 # ------------------- UserResponse Table -------------------
+# Row per answered question, no longer written: submissions go to
+# AttemptAnswers and migration 3 copied the existing rows into it. The old
+# rows stay as read-only history for SQL consumers until a later migration
+# drops the table; for a row per question view of every attempt use
+# attempt_answers.response_rows.
 class UserResponse(db.Model):
     id = db.Column(db.Integer, primary_key=True)
 
@@ -160,6 +192,40 @@ class UserResponse(db.Model):
 
     option_selected = db.Column(db.Integer, nullable=True)
 
+    __table_args__ = (db.Index("ix_user_response_user_quiz", "user_id", "quiz_id"),)
+
+
+# ------------------- AttemptAnswers Table -------------------
+# One row per submitted attempt. `question_ids` holds the quiz's question ids
+# at submit time and `answers` the selected option for each, as aligned packed
+# arrays (int32 and int8, see attempt_answers.py).
+class AttemptAnswers(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+
+    score_id = db.Column(
+        db.Integer,
+        db.ForeignKey("score.id", ondelete="CASCADE"),
+        unique=True,
+        nullable=True,
+    )
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=True
+    )
+    quiz_id = db.Column(
+        db.Integer,
+        db.ForeignKey("quiz.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
+    )
+
+    question_ids = db.Column(db.LargeBinary, nullable=False)
+    answers = db.Column(db.LargeBinary, nullable=False)
+    attempted_at = db.Column(db.DateTime, default=lambda: datetime.now(IST))
+
+    __table_args__ = (
+        db.Index("ix_attempt_answers_user_quiz", "user_id", "quiz_id"),
+    )
+
 
 # ------------------- Score Table -------------------
 class Score(db.Model):
@@ -169,10 +235,15 @@ class Score(db.Model):
         db.Integer, db.ForeignKey("quiz.id", ondelete="CASCADE"), nullable=True
     )
     user_id = db.Column(
-        db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=True
+        db.Integer,
+        db.ForeignKey("user.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
     )
 
-    timestamp_of_attempt = db.Column(db.DateTime, default=lambda: datetime.now(IST))
+    timestamp_of_attempt = db.Column(
+        db.DateTime, default=lambda: datetime.now(IST), index=True
+    )
     correct = db.Column(db.Integer, nullable=True)
     wrong = db.Column(db.Integer, nullable=True)
     unattempted = db.Column(db.Integer, nullable=True)
@@ -188,10 +259,89 @@ class Result(db.Model):
         db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=True
     )
     quiz_id = db.Column(
-        db.Integer, db.ForeignKey("quiz.id", ondelete="CASCADE"), nullable=True
+        db.Integer,
+        db.ForeignKey("quiz.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
     )
 
     score = db.Column(db.Float, nullable=True)
     correct_answers = db.Column(db.Integer, nullable=True)
     total_questions = db.Column(db.Integer, nullable=True)
     attempted_on = db.Column(db.DateTime, default=lambda: datetime.now(IST))
+
+
+# ------------------- QuizStats Table -------------------
+# Rollup of Result rows per quiz, maintained by submit_quiz in the same
+# transaction as the Result insert.
+class QuizStats(db.Model):
+    quiz_id = db.Column(
+        db.Integer, db.ForeignKey("quiz.id", ondelete="CASCADE"), primary_key=True
+    )
+
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0)
+    score_min = db.Column(db.Float, nullable=True)
+    score_max = db.Column(db.Float, nullable=True)
+
+    # Score histogram: 0-30, 30-60, 60-90, 90-100
+    bucket_0_30 = db.Column(db.Integer, nullable=False, default=0)
+    bucket_30_60 = db.Column(db.Integer, nullable=False, default=0)
+    bucket_60_90 = db.Column(db.Integer, nullable=False, default=0)
+    bucket_90_100 = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(IST))
+
+
+# ------------------- UserStats Table -------------------
+# Lifetime rollup of Score rows per user, maintained by submit_quiz.
+class UserStats(db.Model):
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True
+    )
+
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    score_max = db.Column(db.Integer, nullable=True)
+    last_attempt_at = db.Column(db.DateTime, nullable=True)
+
+
+# ------------------- UserMonthlyStats Table -------------------
+# Same rollup split by calendar month (IST), keyed as "YYYY-MM".
+class UserMonthlyStats(db.Model):
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True
+    )
+    month = db.Column(db.String(7), primary_key=True)
+
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    score_max = db.Column(db.Integer, nullable=True)
+
+
+# ------------------- EmailOutbox Table -------------------
+# Rendered messages waiting for the outbox dispatcher. Report tasks enqueue
+# here; dispatch_outbox sends, retries and marks them. `available_at` is when
+# a row may next be claimed: retry backoff for pending rows, claim expiry for
+# rows a dispatcher is sending.
+class EmailOutbox(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+
+    idempotency_key = db.Column(db.String(255), unique=True, nullable=False)
+    recipient = db.Column(db.String(255), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    html = db.Column(db.Text, nullable=True)
+
+    # pending, sending, sent or failed
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+
+    available_at = db.Column(db.DateTime, default=lambda: datetime.now(IST))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(IST))
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_email_outbox_status_available", "status", "available_at"),
+    )
@@ -0,0 +1,230 @@
+import time
+from datetime import datetime, timedelta
+
+from flask_mail import Message
+from mail_delivery import deliver
+from models import IST, EmailOutbox, db
+from rollups import upsert
+from sqlalchemy import delete, func, select, update
+
+# First retry after a minute, doubling with every failed attempt
+RETRY_BASE_SECONDS = 60
+
+CLAIMABLE = ("pending", "sending")
+
+
+def enqueue(messages, chunk_size=1000):
+    """
+    Insert rendered messages into the outbox in bulk; commits.
+
+    `messages` is an iterable of dicts with idempotency_key, recipient,
+    subject, body and optionally html. A key that is already in the outbox is
+    skipped, so re-running a report task never queues the same mail twice.
+    Returns the number of messages actually queued.
+    """
+    table = EmailOutbox.__table__
+    stmt = upsert(table).on_conflict_do_nothing(
+        index_elements=[table.c.idempotency_key]
+    )
+
+    queued = 0
+    chunk = []
+    for message in messages:
+        chunk.append({"html": None, **message})
+        if len(chunk) >= chunk_size:
+            queued += db.session.execute(stmt, chunk).rowcount
+            chunk = []
+    if chunk:
+        queued += db.session.execute(stmt, chunk).rowcount
+    db.session.commit()
+    return queued
+
+
+def claim_batch(batch_size, claim_timeout):
+    """
+    Claim up to `batch_size` due messages for this dispatcher; commits.
+
+    Claimed rows move to "sending" with available_at pushed `claim_timeout`
+    seconds ahead. If the dispatcher dies mid-batch the claim expires and the
+    rows are picked up again, so delivery is at-least-once.
+    """
+    now = datetime.now(IST)
+    claim_until = now + timedelta(seconds=claim_timeout)
+    due = (
+        EmailOutbox.status.in_(CLAIMABLE),
+        EmailOutbox.available_at <= now,
+    )
+
+    ids = (
+        db.session.execute(
+            select(EmailOutbox.id).where(*due).order_by(EmailOutbox.id).limit(batch_size)
+        )
+        .scalars()
+        .all()
+    )
+    if not ids:
+        return []
+
+    db.session.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(ids), *due)
+        .values(status="sending", available_at=claim_until)
+    )
+    db.session.commit()
+
+    # A concurrent dispatcher may have claimed some of them first
+    return db.session.execute(
+        select(
+            EmailOutbox.id,
+            EmailOutbox.recipient,
+            EmailOutbox.subject,
+            EmailOutbox.body,
+            EmailOutbox.html,
+            EmailOutbox.attempts,
+        )
+        .where(
+            EmailOutbox.id.in_(ids),
+            EmailOutbox.status == "sending",
+            EmailOutbox.available_at == claim_until,
+        )
+        .order_by(EmailOutbox.id)
+    ).all()
+
+
+def record_results(sent_ids, failures, max_attempts):
+    """Mark a delivered batch: sent rows, and retry or give up on failures."""
+    now = datetime.now(IST)
+    if sent_ids:
+        db.session.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(sent_ids))
+            .values(status="sent", sent_at=now, attempts=EmailOutbox.attempts + 1)
+        )
+
+    retried = 0
+    for row, error in failures:
+        attempts = row.attempts + 1
+        values = {"attempts": attempts, "last_error": str(error)[:1000]}
+        if attempts >= max_attempts:
+            values["status"] = "failed"
+        else:
+            values["status"] = "pending"
+            values["available_at"] = now + timedelta(
+                seconds=RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+            )
+            retried += 1
+        db.session.execute(
+            update(EmailOutbox).where(EmailOutbox.id == row.id).values(**values)
+        )
+    db.session.commit()
+    return retried
+
+
+def dispatch(
+    mail,
+    batch_size=100,
+    rate_per_second=0,
+    max_attempts=5,
+    claim_timeout=600,
+    max_messages=None,
+):
+    """
+    Drain due outbox messages, one pooled SMTP connection per batch.
+
+    `rate_per_second` (0 for unlimited) caps throughput by pausing between
+    batches. Stops when nothing is due or after `max_messages`. Returns
+    counts of sent, retried and failed messages plus throughput.
+    """
+    totals = {"sent": 0, "retried": 0, "failed": 0, "batches": 0}
+    started = time.perf_counter()
+    processed = 0
+
+    while max_messages is None or processed < max_messages:
+        limit = batch_size
+        if max_messages is not None:
+            limit = min(limit, max_messages - processed)
+        rows = claim_batch(limit, claim_timeout)
+        if not rows:
+            break
+        batch_started = time.perf_counter()
+
+        rows_by_message = {}
+        messages = []
+        for row in rows:
+            message = Message(
+                subject=row.subject,
+                recipients=[row.recipient],
+                body=row.body,
+                html=row.html,
+            )
+            rows_by_message[id(message)] = row
+            messages.append(message)
+
+        sent_ids, failures = [], []
+
+        def on_result(message, error):
+            row = rows_by_message[id(message)]
+            if error is None:
+                sent_ids.append(row.id)
+            else:
+                failures.append((row, error))
+
+        deliver(mail, messages, batch_size=len(messages), on_result=on_result)
+        retried = record_results(sent_ids, failures, max_attempts)
+
+        totals["sent"] += len(sent_ids)
+        totals["retried"] += retried
+        totals["failed"] += len(failures) - retried
+        totals["batches"] += 1
+        processed += len(rows)
+
+        if rate_per_second:
+            pause = len(rows) / rate_per_second - (time.perf_counter() - batch_started)
+            if pause > 0:
+                time.sleep(pause)
+
+    elapsed = time.perf_counter() - started
+    totals["elapsed_seconds"] = round(elapsed, 3)
+    totals["messages_per_second"] = (
+        round(totals["sent"] / elapsed, 1) if totals["sent"] else 0
+    )
+    return totals
+
+
+def next_due_at():
+    """When the earliest pending or claimed message becomes due, or None."""
+    return db.session.execute(
+        select(func.min(EmailOutbox.available_at)).where(
+            EmailOutbox.status.in_(CLAIMABLE)
+        )
+    ).scalar()
+
+
+def purge_sent(older_than_days):
+    """Delete sent messages older than `older_than_days`; commits."""
+    cutoff = datetime.now(IST) - timedelta(days=older_than_days)
+    result = db.session.execute(
+        delete(EmailOutbox).where(
+            EmailOutbox.status == "sent", EmailOutbox.sent_at < cutoff
+        )
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def outbox_stats():
+    counts = dict(
+        db.session.execute(
+            select(EmailOutbox.status, func.count(EmailOutbox.id)).group_by(
+                EmailOutbox.status
+            )
+        ).all()
+    )
+    due = next_due_at()
+    return {
+        "pending": counts.get("pending", 0),
+        "sending": counts.get("sending", 0),
+        "sent": counts.get("sent", 0),
+        "failed": counts.get("failed", 0),
+        "next_due_at": due.isoformat() if due else None,
+    }
@@ -0,0 +1,47 @@
+import base64
+import json
+
+
+def encode_cursor(last_id):
+    """Build an opaque cursor pointing just past the row with `last_id`."""
+    raw = json.dumps({"after": last_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return the id encoded in `cursor`, raising ValueError if it is invalid."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after = json.loads(base64.urlsafe_b64decode(padded))["after"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(after, int):
+        raise ValueError("Invalid cursor")
+    return after
+
+
+def page_args(args, default_limit, max_limit):
+    """Read `cursor` and `limit` from request args as (after_id, limit)."""
+    cursor = args.get("cursor")
+    after = decode_cursor(cursor) if cursor else 0
+
+    limit = args.get("limit", default_limit)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError) as e:
+        raise ValueError("limit must be an integer") from e
+    return after, max(1, min(limit, max_limit))
+
+
+def paginate_by_id(query, id_column, after, limit):
+    """
+    Fetch one keyset page of `query` ordered by `id_column`.
+
+    Reads limit + 1 rows to learn whether another page exists without a COUNT,
+    and returns (rows, next_cursor) where next_cursor is None on the last page.
+    """
+    rows = query.filter(id_column > after).order_by(id_column).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].id)
+    return rows, None
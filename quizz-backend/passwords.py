@@ -0,0 +1,144 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+from flask_security.utils import get_hmac
+
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
+
+class PasswordPoolBusy(Exception):
+    """Every hashing worker is busy and the wait queue is full."""
+
+
+# Everything the pool raises when it cannot hash right now; callers answer 503
+POOL_ERRORS = (PasswordPoolBusy, FutureTimeoutError, BrokenProcessPool)
+
+
+def is_bcrypt_hash(hashed):
+    return bool(hashed) and hashed.startswith(BCRYPT_PREFIXES)
+
+
+def bcrypt_rounds(hashed):
+    return int(hashed.split("$")[2])
+
+
+# Module-level so the process pool can pickle them by name
+def _verify(secret, hashed):
+    return bcrypt.checkpw(secret, hashed.encode("ascii"))
+
+
+def _hash(secret, rounds):
+    return bcrypt.hashpw(secret, bcrypt.gensalt(rounds)).decode("ascii")
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a bounded process pool instead of the request thread.
+
+    At most `workers` hashes run at once and `queue_depth` more may wait;
+    beyond that calls raise PasswordPoolBusy straight away so the caller can
+    answer 503 rather than pile up. A hash taking over `timeout` seconds
+    raises TimeoutError and a crashed pool BrokenProcessPool; POOL_ERRORS
+    covers all three. With workers=0 everything runs inline.
+    The pool is started on first use, so processes that never hash (Celery
+    workers) never start one. Workers are forked rather than spawned because
+    spawning re-imports the main module, and app.py initialises the database
+    at import when run directly.
+    """
+
+    def __init__(self, workers, queue_depth, timeout=30):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_depth) if workers else None
+        self._pool = None
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+
+    def _executor(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("fork"),
+                    )
+        return self._pool
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            result = fn(*args)
+        else:
+            if not self._slots.acquire(blocking=False):
+                with self._lock:
+                    self.rejected += 1
+                raise PasswordPoolBusy()
+            try:
+                result = self._executor().submit(fn, *args).result(timeout=self.timeout)
+            except BrokenProcessPool:
+                # A worker died; start a fresh pool on the next call
+                with self._lock:
+                    self._pool = None
+                raise
+            finally:
+                self._slots.release()
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def verify(self, secret, hashed):
+        return self._run(_verify, secret, hashed)
+
+    def hash(self, secret, rounds):
+        return self._run(_hash, secret, rounds)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue_depth,
+                "started": self._pool is not None,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+# Flask-Security stores bcrypt(HMAC-SHA512(password, salt)) truncated to
+# bcrypt's 72-byte limit; the cheap HMAC runs in the request, bcrypt in the pool.
+def password_secret(password):
+    return get_hmac(password)[:72]
+
+
+def make_password(hasher, password, rounds):
+    """Hash a new password the way Flask-Security's hash_password would."""
+    return hasher.hash(password_secret(password), rounds)
+
+
+def check_password(hasher, user, password, rounds):
+    """
+    Verify `password` for `user` on the hasher's pool.
+
+    A correct password stored with a different work factor than `rounds` is
+    rehashed in place (the caller commits). Non-bcrypt hashes fall back to
+    Flask-Security's inline verify_and_update_password, which also migrates
+    them to the configured scheme.
+    """
+    if not is_bcrypt_hash(user.password):
+        return user.verify_and_update_password(password)
+
+    secret = password_secret(password)
+    if not hasher.verify(secret, user.password):
+        return False
+    if bcrypt_rounds(user.password) != rounds:
+        user.password = hasher.hash(secret, rounds)
+    return True
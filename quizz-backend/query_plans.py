@@ -0,0 +1,70 @@
+from datetime import datetime
+
+from models import AttemptAnswers, Question, Result, Score
+from sqlalchemy import select
+
+# Hot-path queries and the index each must use: (name, statement, index)
+HOT_QUERIES = [
+    (
+        "answer key for a quiz",
+        select(Question.id, Question.correct_option_id)
+        .where(Question.quiz_id == 1)
+        .order_by(Question.id),
+        "ix_question_quiz_id",
+    ),
+    (
+        "a user's attempts at a quiz",
+        select(AttemptAnswers.question_ids, AttemptAnswers.answers).where(
+            AttemptAnswers.user_id == 1, AttemptAnswers.quiz_id == 1
+        ),
+        "ix_attempt_answers_user_quiz",
+    ),
+    (
+        "attempts at a quiz",
+        select(AttemptAnswers.question_ids, AttemptAnswers.answers).where(
+            AttemptAnswers.quiz_id == 1
+        ),
+        "ix_attempt_answers_quiz_id",
+    ),
+    (
+        "a user's scores",
+        select(Score.quiz_id, Score.total_score).where(Score.user_id == 1),
+        "ix_score_user_id",
+    ),
+    (
+        "attempts since a date",
+        select(Score.user_id, Score.total_score).where(
+            Score.timestamp_of_attempt >= datetime(2025, 1, 1)
+        ),
+        "ix_score_timestamp_of_attempt",
+    ),
+    (
+        "results for a quiz",
+        select(Result.user_id, Result.score).where(Result.quiz_id == 1),
+        "ix_result_quiz_id",
+    ),
+]
+
+
+def explain(conn, statement):
+    """SQLite EXPLAIN QUERY PLAN detail lines for `statement`."""
+    sql = statement.compile(conn, compile_kwargs={"literal_binds": True})
+    return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def check_query_plans(engine):
+    """
+    Plan every HOT_QUERIES statement and return (name, index, plan, ok)
+    tuples; ok means the plan reads the table through the expected index
+    rather than scanning it. SQLite only.
+    """
+    checks = []
+    with engine.connect() as conn:
+        # EXPLAIN never checks the schema cookie, so read the schema first
+        # in case another connection changed it since this one cached it
+        conn.exec_driver_sql("SELECT count(*) FROM sqlite_master").scalar()
+        for name, statement, index in HOT_QUERIES:
+            plan = explain(conn, statement)
+            ok = any(index in line for line in plan)
+            checks.append((name, index, plan, ok))
+    return checks
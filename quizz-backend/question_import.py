@@ -0,0 +1,156 @@
+import codecs
+import csv
+import json
+import time
+
+from models import Question, db
+from sqlalchemy import insert
+
+REQUIRED_FIELDS = [
+    "question_statement",
+    "option1",
+    "option2",
+    "option3",
+    "option4",
+    "correct_option_id",
+]
+
+NOT_UTF8 = "Row is not valid UTF-8"
+
+
+def decoded_lines(stream, bad_lines):
+    """
+    Yield the lines of a binary upload as text, keeping their line endings.
+
+    A line that is not valid UTF-8 is yielded with replacement characters and
+    its number added to `bad_lines`, so one bad row does not abort the import.
+    """
+    for line_num, raw in enumerate(stream, start=1):
+        if line_num == 1 and raw.startswith(codecs.BOM_UTF8):
+            raw = raw[len(codecs.BOM_UTF8) :]
+        try:
+            yield raw.decode("utf-8")
+        except UnicodeDecodeError:
+            bad_lines.add(line_num)
+            yield raw.decode("utf-8", errors="replace")
+
+
+def iter_rows(stream, fmt):
+    """
+    Yield (row_number, row, error) triples from an uploaded CSV or JSONL stream.
+
+    The stream is read line by line so large uploads are never held in memory
+    as a whole. Rows that cannot be decoded or parsed are yielded with row
+    None and the reason in `error`; the rows after them are still read.
+    """
+    bad_lines = set()
+    lines = decoded_lines(stream, bad_lines)
+
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        read_up_to = 0
+        while True:
+            try:
+                row = next(reader)
+                error = None
+            except StopIteration:
+                return
+            except csv.Error as e:
+                row, error = None, f"Malformed CSV: {e}"
+            # A CSV record can span several lines
+            first, read_up_to = read_up_to + 1, reader.line_num
+            if error is None and any(
+                n in bad_lines for n in range(first, read_up_to + 1)
+            ):
+                row, error = None, NOT_UTF8
+            yield reader.line_num, row, error
+
+    for line_num, line in enumerate(lines, start=1):
+        if line_num in bad_lines:
+            yield line_num, None, NOT_UTF8
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            yield line_num, None, "Malformed row"
+            continue
+        if not isinstance(row, dict):
+            yield line_num, None, "Malformed row"
+            continue
+        yield line_num, row, None
+
+
+def validate_row(row, quiz_id):
+    """Return (values, error) for a single import row."""
+    if row is None:
+        return None, "Malformed row"
+
+    missing = [
+        field for field in REQUIRED_FIELDS if not str(row.get(field) or "").strip()
+    ]
+    if missing:
+        return None, f"Missing fields: {', '.join(missing)}"
+
+    try:
+        correct_option_id = int(row["correct_option_id"])
+    except (TypeError, ValueError):
+        return None, "correct_option_id must be an integer"
+    if correct_option_id not in (1, 2, 3, 4):
+        return None, "correct_option_id must be between 1 and 4"
+
+    statement = str(row["question_statement"]).strip()
+    return {
+        "quiz_id": quiz_id,
+        "question_statement": statement,
+        "question_search_term": statement.lower(),
+        "option1": str(row["option1"]).strip(),
+        "option2": str(row["option2"]).strip(),
+        "option3": str(row["option3"]).strip(),
+        "option4": str(row["option4"]).strip(),
+        "correct_option_id": correct_option_id,
+    }, None
+
+
+def import_questions(stream, fmt, quiz_id, batch_size=500, max_errors=1000):
+    """
+    Validate and insert every question row from `stream` into `quiz_id`.
+
+    Valid rows are flushed with one executemany INSERT per batch, and all
+    batches share a single transaction that the caller commits. Invalid rows,
+    including ones that are not UTF-8 or not parseable, are skipped and
+    reported with their row number.
+    """
+    started = time.perf_counter()
+    batch, errors = [], []
+    inserted, failed = 0, 0
+
+    for row_number, row, error in iter_rows(stream, fmt):
+        if not error:
+            values, error = validate_row(row, quiz_id)
+        if error:
+            failed += 1
+            if len(errors) < max_errors:
+                errors.append({"row": row_number, "error": error})
+            continue
+
+        batch.append(values)
+        if len(batch) >= batch_size:
+            db.session.execute(insert(Question), batch)
+            inserted += len(batch)
+            batch = []
+
+    if batch:
+        db.session.execute(insert(Question), batch)
+        inserted += len(batch)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "inserted": inserted,
+        "failed": failed,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 4),
+        "rows_per_second": round(inserted / elapsed, 1) if elapsed > 0 else inserted,
+    }
@@ -0,0 +1,96 @@
+import math
+
+# Token buckets as Redis hashes {tokens, ts}. All buckets of a request are
+# checked in one script call: the request is allowed only if every bucket has
+# a token, and only then is one token taken from each. Time comes from the
+# Redis server so every app process sees the same clock.
+#
+# ARGV: capacity, refill per second (one pair per key)
+# Returns: {allowed, retry_after seconds (string), index of the limiting key}
+TOKEN_BUCKET_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local levels = {}
+local retry_after = 0
+local limiting = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2 - 1])
+    local rate = tonumber(ARGV[i * 2])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    if tokens < 1 then
+        local wait = (1 - tokens) / rate
+        if wait > retry_after then
+            retry_after = wait
+            limiting = i
+        end
+    end
+end
+local allowed = limiting == 0 and 1 or 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2 - 1])
+    local rate = tonumber(ARGV[i * 2])
+    local tokens = levels[i]
+    if allowed == 1 then
+        tokens = tokens - 1
+    end
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000) + 1000)
+end
+return {allowed, tostring(retry_after), limiting - 1}
+"""
+
+
+class TokenBucketLimiter:
+    """
+    Per-key token buckets in Redis, shared by every app process.
+
+    A budget is (capacity, period seconds): up to `capacity` requests at
+    once, refilled at capacity/period per second. Shed requests are counted
+    per endpoint and scope in a Redis hash.
+    """
+
+    def __init__(self, redis_client, prefix="ratelimit"):
+        self.redis = redis_client
+        self.prefix = prefix
+        self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def hit(self, endpoint, identities, budgets):
+        """
+        Take a token for `endpoint` from the bucket of every identity.
+
+        `identities` maps scope ("ip", "user") to the caller's value for it
+        and `budgets` maps scope to (capacity, period). Returns (allowed,
+        retry_after seconds, limiting scope or None).
+        """
+        scopes = [scope for scope in budgets if identities.get(scope)]
+        if not scopes:
+            return True, 0, None
+
+        keys, args = [], []
+        for scope in scopes:
+            capacity, period = budgets[scope]
+            keys.append(f"{self.prefix}:{endpoint}:{scope}:{identities[scope]}")
+            args += [capacity, capacity / period]
+
+        allowed, retry_after, limiting = self._script(keys=keys, args=args)
+        if allowed:
+            return True, 0, None
+
+        scope = scopes[int(limiting)]
+        self.redis.hincrby(f"{self.prefix}:shed", f"{endpoint}:{scope}", 1)
+        return False, math.ceil(float(retry_after)), scope
+
+    def shed_counts(self):
+        """{endpoint: {scope: shed requests}} since the counters were reset."""
+        counts = {}
+        for field, value in self.redis.hgetall(f"{self.prefix}:shed").items():
+            endpoint, scope = field.split(":", 1)
+            counts.setdefault(endpoint, {})[scope] = int(value)
+        return counts
+
+    def reset_shed_counts(self):
+        self.redis.delete(f"{self.prefix}:shed")
@@ -0,0 +1,180 @@
+import csv
+import io
+import zlib
+from datetime import datetime, timedelta
+
+from models import Quiz, Score, User, UserStats, db
+from sqlalchemy import and_, func, select
+
+CSV_HEADER = [
+    "USER ID",
+    "FULL NAME",
+    "EMAIL",
+    "TOTAL ATTEMPTS",
+    "AVG SCORE",
+    "MAX SCORE",
+]
+
+
+def parse_filters(data):
+    """
+    Validate export filters from a request body.
+
+    Returns a JSON-serializable dict (so it can be passed to Celery) with
+    date_from/date_to as YYYY-MM-DD strings, subject_id as int and
+    active_only as bool. Raises ValueError on bad input.
+    """
+    data = data or {}
+    filters = {
+        "date_from": None,
+        "date_to": None,
+        "subject_id": None,
+        "active_only": bool(data.get("active_only", False)),
+    }
+
+    for key in ("date_from", "date_to"):
+        if data.get(key):
+            datetime.strptime(data[key], "%Y-%m-%d")
+            filters[key] = data[key]
+
+    if filters["date_from"] and filters["date_to"]:
+        if filters["date_from"] > filters["date_to"]:
+            raise ValueError("date_from must not be after date_to")
+
+    if data.get("subject_id") not in (None, ""):
+        filters["subject_id"] = int(data["subject_id"])
+
+    return filters
+
+
+def user_performance_query(filters):
+    """
+    SELECT for the user performance export, one row per user, ordered by id.
+
+    Unfiltered exports read the per-user rollup. Date or subject filters need
+    the raw Score rows, so those aggregate Score with the filters applied in
+    the outer-join condition (users without matching attempts still appear).
+    """
+    if filters.get("date_from") or filters.get("date_to") or filters.get("subject_id"):
+        conditions = [Score.user_id == User.id]
+        if filters.get("date_from"):
+            conditions.append(
+                Score.timestamp_of_attempt
+                >= datetime.strptime(filters["date_from"], "%Y-%m-%d")
+            )
+        if filters.get("date_to"):
+            conditions.append(
+                Score.timestamp_of_attempt
+                < datetime.strptime(filters["date_to"], "%Y-%m-%d") + timedelta(days=1)
+            )
+        if filters.get("subject_id"):
+            conditions.append(
+                Score.quiz_id.in_(
+                    select(Quiz.id).where(Quiz.subjectid == filters["subject_id"])
+                )
+            )
+
+        stmt = (
+            select(
+                User.id,
+                User.fullname,
+                User.email,
+                func.count(Score.id),
+                func.avg(Score.total_score),
+                func.max(Score.total_score),
+            )
+            .outerjoin(Score, and_(*conditions))
+            .group_by(User.id, User.fullname, User.email)
+        )
+    else:
+        stmt = select(
+            User.id,
+            User.fullname,
+            User.email,
+            func.coalesce(UserStats.attempts, 0),
+            UserStats.score_sum * 1.0 / func.nullif(UserStats.attempts, 0),
+            UserStats.score_max,
+        ).outerjoin(UserStats, User.id == UserStats.user_id)
+
+    if filters.get("active_only"):
+        stmt = stmt.where(User.active.is_(True))
+
+    return stmt.order_by(User.id)
+
+
+def count_users(filters):
+    """Number of rows an export with `filters` will produce (one per user)."""
+    stmt = select(func.count(User.id))
+    if filters.get("active_only"):
+        stmt = stmt.where(User.active.is_(True))
+    return db.session.execute(stmt).scalar() or 0
+
+
+def export_watermark():
+    """
+    Snapshot of the data an export depends on: [max Score.id, max User.id].
+
+    A finished export is still current while this is unchanged.
+    """
+    return list(
+        db.session.execute(
+            select(
+                select(func.max(Score.id)).scalar_subquery(),
+                select(func.max(User.id)).scalar_subquery(),
+            )
+        ).one()
+    )
+
+
+def format_row(row):
+    return [
+        row[0],
+        row[1],
+        row[2],
+        row[3],
+        float(row[4]) if row[4] is not None else 0,
+        row[5] if row[5] is not None else 0,
+    ]
+
+
+def user_performance_batches(filters, batch_size=1000):
+    """
+    Yield the export as lists of CSV-ready rows, `batch_size` at a time.
+
+    Rows come off a server-side cursor (`yield_per`), so memory stays flat no
+    matter how many users are exported.
+    """
+    result = db.session.execute(
+        user_performance_query(filters),
+        execution_options={"yield_per": batch_size},
+    )
+    for partition in result.partitions():
+        yield [format_row(row) for row in partition]
+
+
+def iter_csv_chunks(filters, batch_size=1000, compress=False):
+    """
+    Yield the export as CSV text, one chunk per batch, for a streamed response.
+
+    With `compress` the chunks are gzip bytes instead, produced by a single
+    streaming compressor so the concatenation is one valid .gz file.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+
+    def drain():
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        if compressor is None:
+            return chunk
+        return compressor.compress(chunk.encode("utf-8"))
+
+    writer.writerow(CSV_HEADER)
+    yield drain()
+    for batch in user_performance_batches(filters, batch_size):
+        writer.writerows(batch)
+        yield drain()
+    if compressor is not None:
+        yield compressor.flush()
@@ -0,0 +1,264 @@
+from datetime import datetime
+
+from models import (
+    IST,
+    QuizStats,
+    Result,
+    Score,
+    UserMonthlyStats,
+    UserStats,
+    db,
+)
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Histogram columns on QuizStats, lowest bucket first
+SCORE_BUCKETS = ["bucket_0_30", "bucket_30_60", "bucket_60_90", "bucket_90_100"]
+
+
+def score_bucket(score):
+    """Name of the histogram column a score falls in (same cut-offs as the charts)."""
+    if score < 30:
+        return SCORE_BUCKETS[0]
+    elif score < 60:
+        return SCORE_BUCKETS[1]
+    elif score < 90:
+        return SCORE_BUCKETS[2]
+    return SCORE_BUCKETS[3]
+
+
+def upsert(table):
+    """INSERT ... ON CONFLICT builder for the active database."""
+    if db.session.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def record_quiz_attempt(quiz_id, score):
+    """
+    Fold one submission into the quiz's rollup row.
+
+    Runs as a single upsert in the caller's transaction, so the rollup commits
+    or rolls back together with the Result row it mirrors.
+    """
+    table = QuizStats.__table__
+    bucket = score_bucket(score)
+    now = datetime.now(IST)
+
+    stmt = upsert(table).values(
+        quiz_id=quiz_id,
+        attempts=1,
+        score_sum=score,
+        score_min=score,
+        score_max=score,
+        updated_at=now,
+        **{name: int(name == bucket) for name in SCORE_BUCKETS},
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.quiz_id],
+        set_={
+            "attempts": table.c.attempts + 1,
+            "score_sum": table.c.score_sum + score,
+            "score_min": case(
+                (table.c.score_min.is_(None) | (table.c.score_min > score), score),
+                else_=table.c.score_min,
+            ),
+            "score_max": case(
+                (table.c.score_max.is_(None) | (table.c.score_max < score), score),
+                else_=table.c.score_max,
+            ),
+            bucket: table.c[bucket] + 1,
+            "updated_at": now,
+        },
+    )
+    db.session.execute(stmt)
+
+
+def quiz_stats_from_results():
+    """Aggregate the raw Result table into QuizStats-shaped rows."""
+    return (
+        select(
+            Result.quiz_id,
+            func.count(Result.id).label("attempts"),
+            func.coalesce(func.sum(Result.score), 0).label("score_sum"),
+            func.min(Result.score).label("score_min"),
+            func.max(Result.score).label("score_max"),
+            func.sum(case((Result.score < 30, 1), else_=0)).label("bucket_0_30"),
+            func.sum(
+                case(((Result.score >= 30) & (Result.score < 60), 1), else_=0)
+            ).label("bucket_30_60"),
+            func.sum(
+                case(((Result.score >= 60) & (Result.score < 90), 1), else_=0)
+            ).label("bucket_60_90"),
+            func.sum(case((Result.score >= 90, 1), else_=0)).label("bucket_90_100"),
+        )
+        .where(Result.quiz_id.isnot(None))
+        .group_by(Result.quiz_id)
+    )
+
+
+STATS_COLUMNS = [
+    "quiz_id",
+    "attempts",
+    "score_sum",
+    "score_min",
+    "score_max",
+    *SCORE_BUCKETS,
+]
+
+
+def rebuild_quiz_stats():
+    """Replace every QuizStats row with a fresh aggregate of Result."""
+    db.session.execute(delete(QuizStats))
+    result = db.session.execute(
+        insert(QuizStats).from_select(STATS_COLUMNS, quiz_stats_from_results())
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def check_quiz_stats(tolerance=1e-6):
+    """
+    Compare the rollup with a fresh aggregate of Result.
+
+    Returns a list of mismatches as dicts with quiz_id, field, expected (from
+    Result) and actual (from QuizStats). An empty list means consistent.
+    """
+    expected = {
+        row.quiz_id: row._asdict()
+        for row in db.session.execute(quiz_stats_from_results())
+    }
+    actual = {
+        row.quiz_id: {column: getattr(row, column) for column in STATS_COLUMNS}
+        for row in QuizStats.query.all()
+    }
+
+    mismatches = []
+    for quiz_id in sorted(expected.keys() | actual.keys()):
+        want = expected.get(quiz_id, {})
+        have = actual.get(quiz_id, {})
+        for column in STATS_COLUMNS[1:]:
+            a, b = want.get(column), have.get(column)
+            if a == b:
+                continue
+            if a is not None and b is not None and abs(a - b) <= tolerance:
+                continue
+            mismatches.append(
+                {"quiz_id": quiz_id, "field": column, "expected": a, "actual": b}
+            )
+    return mismatches
+
+
+def month_key(when):
+    return when.strftime("%Y-%m")
+
+
+def record_user_attempt(user_id, total_score, attempted_at):
+    """
+    Fold one submission into the user's lifetime and monthly rollup rows.
+
+    `total_score` is the integer Score.total_score, matching what csv_report
+    and the monthly report have always averaged.
+    """
+    for table, keys in (
+        (UserStats.__table__, {"user_id": user_id}),
+        (
+            UserMonthlyStats.__table__,
+            {"user_id": user_id, "month": month_key(attempted_at)},
+        ),
+    ):
+        values = {
+            **keys,
+            "attempts": 1,
+            "score_sum": total_score,
+            "score_max": total_score,
+        }
+        set_ = {
+            "attempts": table.c.attempts + 1,
+            "score_sum": table.c.score_sum + total_score,
+            "score_max": case(
+                (
+                    table.c.score_max.is_(None) | (table.c.score_max < total_score),
+                    total_score,
+                ),
+                else_=table.c.score_max,
+            ),
+        }
+        if "last_attempt_at" in table.c:
+            values["last_attempt_at"] = attempted_at
+            set_["last_attempt_at"] = attempted_at
+
+        stmt = upsert(table).values(**values)
+        db.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[table.c[key] for key in keys], set_=set_
+            )
+        )
+
+
+def rebuild_user_stats(batch_size=5000):
+    """
+    Replace both user rollups with a fresh aggregate of Score.
+
+    Streams Score rows once and aggregates in Python so the month bucketing
+    does not depend on database-specific date functions.
+    """
+    lifetime, monthly = {}, {}
+    rows = (
+        db.session.query(Score.user_id, Score.total_score, Score.timestamp_of_attempt)
+        .filter(Score.user_id.isnot(None), Score.total_score.isnot(None))
+        .execution_options(yield_per=batch_size)
+    )
+    for user_id, total_score, attempted_at in rows:
+        # [attempts, score_sum, score_max, last_attempt_at]
+        targets = [lifetime.setdefault(user_id, [0, 0, None, None])]
+        if attempted_at is not None:
+            key = (user_id, month_key(attempted_at))
+            targets.append(monthly.setdefault(key, [0, 0, None, None]))
+
+        for stats in targets:
+            stats[0] += 1
+            stats[1] += total_score
+            stats[2] = total_score if stats[2] is None else max(stats[2], total_score)
+            if attempted_at is not None and (
+                stats[3] is None or attempted_at > stats[3]
+            ):
+                stats[3] = attempted_at
+
+    db.session.execute(delete(UserStats))
+    db.session.execute(delete(UserMonthlyStats))
+    if lifetime:
+        db.session.execute(
+            insert(UserStats),
+            [
+                {
+                    "user_id": user_id,
+                    "attempts": attempts,
+                    "score_sum": score_sum,
+                    "score_max": score_max,
+                    "last_attempt_at": last,
+                }
+                for user_id, (attempts, score_sum, score_max, last) in lifetime.items()
+            ],
+        )
+    if monthly:
+        db.session.execute(
+            insert(UserMonthlyStats),
+            [
+                {
+                    "user_id": user_id,
+                    "month": month,
+                    "attempts": attempts,
+                    "score_sum": score_sum,
+                    "score_max": score_max,
+                }
+                for (user_id, month), (
+                    attempts,
+                    score_sum,
+                    score_max,
+                    _,
+                ) in monthly.items()
+            ],
+        )
+    db.session.commit()
+    return len(lifetime), len(monthly)
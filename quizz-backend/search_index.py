@@ -0,0 +1,169 @@
+import re
+
+from sqlalchemy import text
+
+# entity -> (type code, table, indexed text built from the row alias `{row}`)
+# Index rowids are `entity_id * 8 + type code`, so a row can be replaced or
+# removed by rowid without scanning the index.
+ENTITIES = {
+    "user": (
+        1,
+        '"user"',
+        "coalesce({row}.name_search_term, lower({row}.fullname), '')"
+        " || ' ' || coalesce(lower({row}.email), '')",
+    ),
+    "subject": (
+        2,
+        "subject",
+        "coalesce({row}.name_search_term, lower({row}.name), '')",
+    ),
+    "chapter": (
+        3,
+        "chapter",
+        "coalesce({row}.name_search_term, lower({row}.name), '')",
+    ),
+    "quiz": (
+        4,
+        "quiz",
+        "coalesce(lower({row}.remarks), '')"
+        " || ' ' || coalesce({row}.subject_name_search_term, '')"
+        " || ' ' || coalesce({row}.chapter_name_search_term, '')",
+    ),
+    "question": (
+        5,
+        "question",
+        "coalesce({row}.question_search_term, lower({row}.question_statement), '')",
+    ),
+}
+
+CREATE_INDEX = """
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+    entity UNINDEXED,
+    content,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def is_supported(engine):
+    """True on SQLite builds compiled with FTS5; callers fall back to LIKE otherwise."""
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.connect() as conn:
+        options = conn.exec_driver_sql("PRAGMA compile_options").scalars().all()
+    return "ENABLE_FTS5" in options
+
+
+def trigger_statements():
+    """CREATE TRIGGER statements that keep the index in step with each table."""
+    statements = []
+    for entity, (code, table, expr) in ENTITIES.items():
+        new_text = expr.format(row="NEW")
+        statements += [
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {entity}_search_ai AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO search_index(rowid, entity, content)
+                VALUES (NEW.id * 8 + {code}, '{entity}', {new_text});
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {entity}_search_au AFTER UPDATE ON {table}
+            BEGIN
+                DELETE FROM search_index WHERE rowid = OLD.id * 8 + {code};
+                INSERT INTO search_index(rowid, entity, content)
+                VALUES (NEW.id * 8 + {code}, '{entity}', {new_text});
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {entity}_search_ad AFTER DELETE ON {table}
+            BEGIN
+                DELETE FROM search_index WHERE rowid = OLD.id * 8 + {code};
+            END
+            """,
+        ]
+    return statements
+
+
+def ensure_search_index(engine):
+    """
+    Create the FTS5 index and its triggers if they are missing.
+
+    A freshly created index is populated from the existing tables, so older
+    databases pick up search without a separate step.
+    """
+    if not is_supported(engine):
+        return False
+
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'search_index'")
+        ).first()
+        conn.execute(text(CREATE_INDEX))
+        for statement in trigger_statements():
+            conn.execute(text(statement))
+        if not exists:
+            _populate(conn)
+    return True
+
+
+def rebuild_search_index(engine):
+    """Drop and repopulate every index entry. Returns entries per entity."""
+    with engine.begin() as conn:
+        conn.execute(text(CREATE_INDEX))
+        conn.execute(text("DELETE FROM search_index"))
+        counts = _populate(conn)
+        conn.execute(text("INSERT INTO search_index(search_index) VALUES ('optimize')"))
+    return counts
+
+
+def _populate(conn):
+    counts = {}
+    for entity, (code, table, expr) in ENTITIES.items():
+        result = conn.execute(
+            text(
+                f"INSERT INTO search_index(rowid, entity, content) "
+                f"SELECT src.id * 8 + {code}, '{entity}', {expr.format(row='src')} "
+                f"FROM {table} AS src"
+            )
+        )
+        counts[entity] = result.rowcount
+    return counts
+
+
+def to_match_query(query):
+    """Turn free text into an FTS5 query that prefix-matches every word."""
+    tokens = TOKEN_RE.findall(query.lower())
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search(session, query, entity, limit, offset=0):
+    """
+    Return up to `limit` (ids, has_more) for `entity` matching `query`,
+    best bm25 rank first.
+    """
+    match = to_match_query(query)
+    if not match:
+        return [], False
+
+    code = ENTITIES[entity][0]
+    rows = session.execute(
+        text(
+            "SELECT (rowid - :code) / 8 FROM search_index "
+            "WHERE search_index MATCH :match AND entity = :entity "
+            "ORDER BY rank LIMIT :limit OFFSET :offset"
+        ),
+        {
+            "code": code,
+            "match": match,
+            "entity": entity,
+            "limit": limit + 1,
+            "offset": offset,
+        },
+    ).all()
+
+    ids = [row[0] for row in rows[:limit]]
+    return ids, len(rows) > limit
@@ -0,0 +1,113 @@
+from array import array
+from datetime import datetime
+
+from attempt_answers import pack_rows
+from models import IST, AttemptAnswers, Question, Result, Score, db
+from sqlalchemy import insert
+
+
+def load_answer_key(quiz_id):
+    """
+    Load the answer key for a quiz as two aligned compact arrays:
+    question ids and their correct option ids. Returns None for a quiz with
+    no questions.
+    """
+    rows = (
+        db.session.query(Question.id, Question.correct_option_id)
+        .filter_by(quiz_id=quiz_id)
+        .order_by(Question.id)
+        .all()
+    )
+    if not rows:
+        return None
+
+    question_ids = array("l", (row[0] for row in rows))
+    correct_options = array("b", (row[1] or 0 for row in rows))
+    return question_ids, correct_options
+
+
+def grade_responses(answer_key, data):
+    """
+    Grade a submission against `answer_key`, the (question_ids,
+    correct_options) arrays returned by `load_answer_key`.
+
+    Returns the response rows ready for insertion together with the
+    correct/wrong/unattempted counts. No database work happens here, so it can
+    run before the write transaction starts.
+    """
+    rows = []
+    correct, wrong, unattempted = 0, 0, 0
+
+    for question_id, correct_option_id in zip(*answer_key):
+        selected = data.get(str(question_id))
+        if selected is None:
+            unattempted += 1
+            option_selected = -1
+        else:
+            option_selected = int(selected)
+            if option_selected == correct_option_id:
+                correct += 1
+            else:
+                wrong += 1
+
+        rows.append({"question_id": question_id, "option_selected": option_selected})
+
+    return rows, correct, wrong, unattempted
+
+
+def save_submission(
+    user_id, quiz_id, rows, correct, wrong, unattempted, attempted_at=None
+):
+    """
+    Persist a graded submission with Core INSERTs.
+
+    One INSERT each for the Result and Score rows, then one AttemptAnswers row
+    holding every answer packed against the question order. Nothing passes
+    through the ORM unit of work, so the SQLite write lock is only held for
+    these three statements and the commit issued by the caller.
+
+    Both rows are stamped with `attempted_at` (default: now, IST) so callers
+    can file the attempt into the same month as the rows themselves.
+    """
+    attempted_at = attempted_at or datetime.now(IST)
+
+    total_questions = len(rows)
+    score = (correct * 100) / total_questions if total_questions > 0 else 0
+
+    db.session.execute(
+        insert(Result.__table__).values(
+            user_id=user_id,
+            quiz_id=quiz_id,
+            score=score,
+            correct_answers=correct,
+            total_questions=total_questions,
+            attempted_on=attempted_at,
+        )
+    )
+    score_id = db.session.execute(
+        insert(Score.__table__).values(
+            quiz_id=quiz_id,
+            user_id=user_id,
+            correct=correct,
+            wrong=wrong,
+            unattempted=unattempted,
+            total_score=int(score),
+            status="completed",
+            timestamp_of_attempt=attempted_at,
+        )
+    ).inserted_primary_key[0]
+
+    if rows:
+        question_ids, answers = pack_rows(rows)
+        db.session.execute(
+            insert(AttemptAnswers.__table__).values(
+                score_id=score_id,
+                user_id=user_id,
+                quiz_id=quiz_id,
+                question_ids=question_ids,
+                answers=answers,
+                attempted_at=attempted_at,
+            )
+        )
+
+    return score
@@ -1,24 +1,38 @@
 # backend/tasks.py
 import csv
+import gzip
 import os
 from datetime import datetime, timedelta
-from itertools import groupby
-from operator import attrgetter
 
-from celery import shared_task
-from flask_mail import Message
-from models import IST, Score, User, db
-from sqlalchemy import func
-from sqlalchemy.orm import joinedload
+from attempt_export import export_attempt_data as write_attempt_export
+from attempt_export import prune_runs
+from celery import chord, group, shared_task
+from export_jobs import prune_exports
+from flask import current_app
+from mail_templates import (
+    DAILY_REMINDER_SUBJECT,
+    DAILY_REMINDER_TEXT,
+    MONTHLY_REPORT_HTML,
+    MONTHLY_REPORT_SUBJECT,
+    MONTHLY_REPORT_TEXT,
+)
+from models import IST, Score, User, UserMonthlyStats, db
+from reports import CSV_HEADER, count_users, user_performance_batches
+from outbox import dispatch, enqueue, next_due_at, purge_sent
+from rollups import month_key
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
 
 
 # Task 2: Monthly Report sent via email
 @shared_task(ignore_results=False, name="send_monthly_activity_report")
 def send_monthly_activity_report():
-  
-    
-    from app import mail
+    """
+    Email every user with activity last month a summary of it.
 
+    Messages are rendered from precompiled templates and queued in the email
+    outbox in bulk; dispatch_outbox delivers them.
+    """
     try:
         # --- 1. Calculate the date range for the previous month ---
         # We use the IST timezone defined in models.py for all date operations.
@@ -29,105 +43,62 @@ def send_monthly_activity_report():
         last_day_of_prev_month = first_day_of_current_month - timedelta(days=1)
         first_day_of_prev_month = last_day_of_prev_month.replace(day=1)
 
-        # --- 2. Fetch all scores from the previous month in a single efficient query ---
-        all_scores_last_month = (
-            Score.query.options(joinedload(Score.user), joinedload(Score.quiz))
+        # --- 2. Read last month's per-user rollup rows (one per active user) ---
+        month_name = first_day_of_prev_month.strftime("%B %Y")
+        monthly_stats = (
+            db.session.query(
+                User.id,
+                User.email,
+                User.fullname,
+                UserMonthlyStats.attempts,
+                UserMonthlyStats.score_sum,
+                UserMonthlyStats.score_max,
+            )
+            .join(UserMonthlyStats, UserMonthlyStats.user_id == User.id)
             .filter(
-                Score.timestamp_of_attempt >= first_day_of_prev_month,
-                Score.timestamp_of_attempt < first_day_of_current_month,
+                UserMonthlyStats.month == month_key(first_day_of_prev_month),
+                UserMonthlyStats.attempts > 0,
             )
-            .order_by(Score.user_id)
-            .all()
+            .order_by(User.id)
+            .execution_options(yield_per=current_app.config["MAIL_BATCH_SIZE"])
         )
 
-        if not all_scores_last_month:
+        # --- 3. Render one message per user as rows stream in ---
+        month = month_key(first_day_of_prev_month)
+        subject = MONTHLY_REPORT_SUBJECT.render(month_name=month_name)
+
+        def messages():
+            for user_id, email, fullname, attempts, score_sum, score_max in monthly_stats:
+                context = {
+                    "month_name": month_name,
+                    "fullname": fullname,
+                    "attempts": attempts,
+                    "best_score": score_max,
+                    "avg_score": score_sum / attempts,
+                }
+                yield {
+                    "idempotency_key": f"monthly-report:{month}:{user_id}",
+                    "recipient": email,
+                    "subject": subject,
+                    "body": MONTHLY_REPORT_TEXT.render(context),
+                    "html": MONTHLY_REPORT_HTML.render(context),
+                }
+
+        # --- 4. Queue in the outbox and wake the dispatcher ---
+        queued = enqueue(messages())
+
+        if not queued:
             return {
                 "status": "completed",
-                "message": "No user activity in the last month. No reports sent.",
+                "message": "No new monthly reports to send.",
+                "queued": 0,
             }
 
-        reports_sent = 0
-
-        # --- 3. Group scores by user ---
-        user_scores_grouped = groupby(all_scores_last_month, key=attrgetter("user"))
-
-        # --- 4. Iterate over each user and their scores to build and send the email ---
-        for user, scores_iterator in user_scores_grouped:
-            scores = list(scores_iterator)
-
-            # Skip only if the user object is missing. The check for user.active has been removed.
-            if not user:
-                continue
-
-            # Calculate statistics for the user
-            valid_scores = [s.total_score for s in scores if s.total_score is not None]
-            if not valid_scores:
-                continue  # Skip users with no valid scores.
-
-            total_score = sum(valid_scores)
-            avg_score = total_score / len(valid_scores)
-
-            # --- 5. Build a rich HTML email body ---
-            month_name = first_day_of_prev_month.strftime("%B %Y")
-            quiz_details_html = ""
-            for score in scores:
-                quiz_title = score.quiz.remarks if score.quiz else "Unknown Quiz"
-                quiz_details_html += f"<li><strong>{quiz_title}:</strong> {score.total_score or 'N/A'}</li>"
-
-            report_html = f"""
-            <html>
-            <head>
-                <style>
-                    body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Helvetica, Arial, sans-serif; line-height: 1.6; color: #333; }}
-                    .container {{ padding: 25px; border: 1px solid #e0e0e0; border-radius: 8px; max-width: 600px; margin: 20px auto; background-color: #f9f9f9; }}
-                    .header {{ font-size: 24px; color: #2c3e50; margin-bottom: 20px; }}
-                    .footer {{ margin-top: 25px; font-size: 12px; color: #888; text-align: center; }}
-                    ul {{ list-style-type: none; padding-left: 0; }}
-                    li {{ background: #ffffff; margin-bottom: 8px; padding: 12px; border-radius: 5px; border-left: 4px solid #3498db; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <p class="header">Your Monthly Report for {month_name}</p>
-                    <p>Hi {user.fullname or "there"},</p>
-                    <p>Here is your quiz activity summary from last month:</p>
-                    <ul>{quiz_details_html}</ul>
-                    <p>Your average score for the month was: <strong>{avg_score:.2f}</strong></p>
-                    <p>Keep up the great work!</p>
-                    <div class="footer">
-                        <p>Regards,<br>The Quiz Master Team</p>
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
-
-            # --- 6. Create a plain text version for compatibility ---
-            plain_text_details = "".join(
-                [
-                    f"- Quiz: {s.quiz.remarks if s.quiz else 'Unknown Quiz'}, Score: {s.total_score or 'N/A'}\n"
-                    for s in scores
-                ]
-            )
-            report_text = f"Hi {user.fullname or 'User'},\n\nHere is your activity report for {month_name}:\n{plain_text_details}\nAverage Score: {avg_score:.2f}\n\nKeep up the great work!\n\nRegards,\nThe Quiz Master Team"
-
-            # --- 7. Send the email ---
-            try:
-                msg = Message(
-                    subject=f"Your Quiz Master Report for {month_name}",
-                    recipients=[user.email],
-                    body=report_text,
-                    html=report_html,
-                )
-                mail.send(msg)
-                reports_sent += 1
-            except Exception as mail_error:
-                print(f"Failed to send email to {user.email}: {mail_error}")
-                pass
-
+        dispatch_outbox.delay()
         return {
             "status": "completed",
-            "message": f"Monthly reports sent to {reports_sent} users.",
+            "message": f"Monthly reports queued for {queued} users.",
+            "queued": queued,
         }
 
     except Exception as e:
@@ -136,113 +107,231 @@ def send_monthly_activity_report():
 
 
 # Task:3 - Daily Reminders
+def iter_inactive_user_ids(chunk_size, days=7):
+    """Yield ids of users with no attempt in the last `days`, in lists of `chunk_size`."""
+    inactive_threshold = datetime.now() - timedelta(days=days)
+
+    active_users_in_last_7_days = (
+        db.session.query(Score.user_id)
+        .filter(
+            Score.timestamp_of_attempt > inactive_threshold,
+            Score.user_id.isnot(None),
+        )
+        .distinct()
+    )
+
+    result = db.session.execute(
+        select(User.id)
+        .where(User.id.notin_(active_users_in_last_7_days))
+        .order_by(User.id),
+        execution_options={"yield_per": chunk_size},
+    )
+    for partition in result.partitions():
+        yield [user_id for (user_id,) in partition]
+
+
 @shared_task(ignore_results=False, name="send_daily_reminders")
 def send_daily_reminders():
-    # Import mail inside the task
-    from app import mail
+    """
+    Fan the reminder run out over the workers.
 
+    Inactive user ids are streamed in chunks of REMINDER_CHUNK_SIZE, each
+    chunk becomes a send_reminder_chunk task that queues its messages in the
+    email outbox, and a chord callback (summarize_reminders) totals them and
+    wakes the dispatcher. A failing chunk is retried on its own without
+    touching the others.
+    """
     try:
-        inactive_threshold = datetime.now() - timedelta(days=7)
+        chunk_size = current_app.config["REMINDER_CHUNK_SIZE"]
+        header = [
+            send_reminder_chunk.s(user_ids)
+            for user_ids in iter_inactive_user_ids(chunk_size)
+        ]
+        if not header:
+            return {"status": "completed", "message": "No inactive users."}
+
+        summary = chord(group(header))(summarize_reminders.s())
+        return {
+            "status": "dispatched",
+            "message": f"Reminders queued in {len(header)} chunks.",
+            "chunks": len(header),
+            "summary_task_id": summary.id,
+        }
 
-        active_users_in_last_7_days = (
-            db.session.query(Score.user_id)
-            .filter(Score.timestamp_of_attempt > inactive_threshold)
-            .distinct()
-        )
+    except Exception as e:
+        return {"status": "failed", "error": str(e)}
 
-        inactive_users = User.query.filter(
-            User.id.notin_(active_users_in_last_7_days)
-        ).all()
 
-        for user in inactive_users:
-            reminder_message = f"""Hi {user.fullname or "User"},
+@shared_task(
+    bind=True,
+    ignore_results=False,
+    name="send_reminder_chunk",
+    acks_late=True,
+    max_retries=3,
+    default_retry_delay=60,
+)
+def send_reminder_chunk(self, user_ids):
+    """
+    Queue the daily reminder for one chunk of users in the email outbox.
+
+    Retried (up to max_retries) when the database is unavailable. Idempotency
+    keys are per user per day, so a retried or re-run chunk queues nothing twice.
+    """
+    try:
+        users = db.session.execute(
+            select(User.id, User.email, User.fullname).where(User.id.in_(user_ids))
+        ).all()
+        today = datetime.now(IST).date().isoformat()
+        queued = enqueue(
+            {
+                "idempotency_key": f"daily-reminder:{today}:{user_id}",
+                "recipient": email,
+                "subject": DAILY_REMINDER_SUBJECT,
+                "body": DAILY_REMINDER_TEXT.render(fullname=fullname),
+            }
+            for user_id, email, fullname in users
+        )
+    except OperationalError as e:
+        db.session.rollback()
+        raise self.retry(exc=e)
+
+    return {"users": len(users), "queued": queued}
+
+
+@shared_task(ignore_results=False, name="summarize_reminders")
+def summarize_reminders(chunk_results):
+    """Chord callback: total the queued reminders and start the dispatcher."""
+    queued = sum(result["queued"] for result in chunk_results)
+    if queued:
+        dispatch_outbox.delay()
+    return {
+        "status": "completed",
+        "message": f"Reminders queued for {queued} inactive users.",
+        "chunks": len(chunk_results),
+        "queued": queued,
+    }
+
+
+# Task:4 - Email outbox dispatcher
+@shared_task(bind=True, ignore_results=False, name="dispatch_outbox")
+def dispatch_outbox(self):
+    """
+    Send due messages from the email outbox.
 
-We miss you at Quiz Master! Come back and test your knowledge with our new quizzes.
+    Batch size, rate limit, retry count and per-run cap come from the
+    OUTBOX_* settings. A run that hits its cap queues a follow-up run; a run
+    that scheduled retries queues one for when the first retry is due. Old
+    sent rows are purged at the end.
+    """
+    from app import mail
 
-Regards,
-The Quiz Master Team"""
+    try:
+        config = current_app.config
+        result = dispatch(
+            mail,
+            batch_size=config["MAIL_BATCH_SIZE"],
+            rate_per_second=config["OUTBOX_RATE_PER_SECOND"],
+            max_attempts=config["OUTBOX_MAX_ATTEMPTS"],
+            claim_timeout=config["OUTBOX_CLAIM_TIMEOUT_SECONDS"],
+            max_messages=config["OUTBOX_MAX_PER_RUN"],
+        )
 
-            try:
-                msg = Message(
-                    subject="We miss you at Quiz Master!",
-                    recipients=[user.email],
-                    body=reminder_message,
-                )
-                mail.send(msg)
-            except Exception:
-                pass
+        due = next_due_at()
+        if due is not None and self.request.id:
+            if due <= datetime.now(IST).replace(tzinfo=None):
+                dispatch_outbox.delay()
+            elif result["retried"]:
+                dispatch_outbox.apply_async(eta=due.replace(tzinfo=IST))
 
-        return {
-            "status": "completed",
-            "message": f"Reminders sent to {len(inactive_users)} inactive users.",
-        }
+        result["purged"] = purge_sent(config["OUTBOX_KEEP_SENT_DAYS"])
+        return {"status": "completed", **result}
 
     except Exception as e:
         return {"status": "failed", "error": str(e)}
 
 
 # Task:1 - Download CSV for Admin
-@shared_task(ignore_results=False, name="csv_report")
-def csv_report():
+@shared_task(bind=True, ignore_results=False, name="csv_report")
+def csv_report(self, filters=None, compress=False, batch_size=1000):
     """
     Celery task to generate a CSV report of user performance statistics.
 
-    This task queries the database to get statistics for each user,
-    including total attempts, average score, and max score.
-    It then generates a CSV file and saves it to the static directory.
+    Rows (total attempts, average score and max score per user) are streamed
+    from the database in batches and written chunk by chunk, optionally
+    gzip-compressed. `filters` comes from reports.parse_filters. Progress is
+    published as a PROGRESS state with rows_processed/total_rows so the
+    download endpoint can report a percentage.
     """
     try:
         os.makedirs("exports", exist_ok=True)
+        filters = filters or {}
+        total_rows = count_users(filters)
 
-        users_stat = (
-            db.session.query(
-                User.id,
-                User.fullname,  # Changed from full_name to fullname
-                User.email,
-                func.count(Score.id),
-                func.avg(Score.total_score),
-                func.max(Score.total_score),
-            )
-            .outerjoin(Score, User.id == Score.user_id)  # Explicit join condition
-            .group_by(
-                User.id, User.fullname, User.email
-            )  # Group by all non-aggregated columns
-            .all()
-        )
-
-        # Generate a unique filename based on the current timestamp.
+        # Generate a unique filename based on the current timestamp (and task
+        # id, so exports with different filters never overwrite each other).
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        filename = f"user_performance_{timestamp}.csv"
+        suffix = f"_{self.request.id[:8]}" if self.request.id else ""
+        filename = f"user_performance_{timestamp}{suffix}.csv"
+        if compress:
+            filename += ".gz"
         filepath = f"exports/{filename}"
 
-        # Write the data to a CSV file.
-        with open(filepath, "w", newline="", encoding="utf-8") as csvfile:
+        if compress:
+            csvfile = gzip.open(filepath, "wt", newline="", encoding="utf-8")
+        else:
+            csvfile = open(filepath, "w", newline="", encoding="utf-8")
+
+        rows_processed = 0
+        with csvfile:
             writer = csv.writer(csvfile)
             # Write the header row.
-            writer.writerow(
-                [
-                    "USER ID",
-                    "FULL NAME",
-                    "EMAIL",
-                    "TOTAL ATTEMPTS",
-                    "AVG SCORE",
-                    "MAX SCORE",
-                ]
-            )
+            writer.writerow(CSV_HEADER)
+
+            # Write data rows one batch at a time.
+            for batch in user_performance_batches(filters, batch_size):
+                writer.writerows(batch)
+                rows_processed += len(batch)
+                if self.request.id:
+                    self.update_state(
+                        state="PROGRESS",
+                        meta={
+                            "rows_processed": rows_processed,
+                            "total_rows": total_rows,
+                        },
+                    )
+
+        prune_exports(
+            "exports",
+            current_app.config["EXPORT_MAX_AGE_DAYS"] * 86400,
+            current_app.config["EXPORT_MAX_TOTAL_MB"] * 1024 * 1024,
+            keep={filename},
+        )
+
+        return {
+            "status": "completed",
+            "url": f"/exports/{filename}",
+            "rows": rows_processed,
+        }
+    except Exception as e:
+        return {"status": "failed", "error": str(e)}
+
 
-            # Write data rows for each user.
-            for row in users_stat:
-                writer.writerow(
-                    [
-                        row.id,
-                        row.fullname,
-                        row.email,
-                        row[3],
-                        float(row[4]) if row[4] is not None else 0,
-                        row[5] if row[5] is not None else 0,
-                    ]
-                )
-
-        return {"status": "completed", "url": f"/exports/{filename}"}
+# Task:3 - Columnar export of raw attempt data for analytics
+@shared_task(ignore_results=False, name="export_attempt_data")
+def export_attempt_data(full=False, batch_size=50000):
+    """
+    Celery task exporting Score, Result and per-question answer rows to Parquet.
+
+    Incremental by default (rows above the previous run's id watermark); see
+    attempt_export.export_attempt_data for the file layout and manifest.
+    """
+    try:
+        manifest = write_attempt_export(full=full, batch_size=batch_size)
+        prune_runs(current_app.config["EXPORT_ANALYTICS_MAX_AGE_DAYS"] * 86400)
+        return {
+            "status": "completed",
+            "manifest": f"/exports/analytics/{manifest['run_id']}/manifest.json",
+            "rows": {name: t["rows"] for name, t in manifest["tables"].items()},
+        }
     except Exception as e:
         return {"status": "failed", "error": str(e)}
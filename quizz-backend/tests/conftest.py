@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+# The backend modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db  # noqa: E402
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Build a bare Flask app bound to a fresh SQLite file, without app.py's services."""
+
+    def make(filename="quizz.db"):
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / filename}"
+        db.init_app(app)
+        return app
+
+    return make
@@ -0,0 +1,124 @@
+import sqlite3
+
+import migrations
+from attempt_answers import attempt_responses
+from models import AttemptAnswers, db
+from query_plans import HOT_QUERIES, check_query_plans
+from sqlalchemy import inspect
+
+# The tables migrations touch, as the first release created them (no
+# secondary indexes); create_all adds every table that is missing.
+BASELINE_SCHEMA = """
+CREATE TABLE chapter (
+    id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(255),
+    name_search_term VARCHAR(255), description TEXT, subjectid INTEGER
+);
+CREATE TABLE quiz (
+    id INTEGER NOT NULL PRIMARY KEY, chapterid INTEGER,
+    chapter_name_search_term VARCHAR(255), subjectid INTEGER,
+    subject_name_search_term VARCHAR(255), date_of_quiz DATE,
+    duration_of_quiz DATETIME, remarks TEXT
+);
+CREATE TABLE question (
+    id INTEGER NOT NULL PRIMARY KEY, quiz_id INTEGER, question_statement TEXT,
+    question_search_term TEXT, option1 VARCHAR(255), option2 VARCHAR(255),
+    option3 VARCHAR(255), option4 VARCHAR(255), correct_option_id INTEGER
+);
+CREATE TABLE score (
+    id INTEGER NOT NULL PRIMARY KEY, quiz_id INTEGER, user_id INTEGER,
+    timestamp_of_attempt DATETIME, correct INTEGER, wrong INTEGER,
+    unattempted INTEGER, total_score INTEGER, status VARCHAR(50)
+);
+CREATE TABLE result (
+    id INTEGER NOT NULL PRIMARY KEY, user_id INTEGER, quiz_id INTEGER,
+    score FLOAT, correct_answers INTEGER, total_questions INTEGER,
+    attempted_on DATETIME
+);
+CREATE TABLE user_response (
+    id INTEGER NOT NULL PRIMARY KEY, user_id INTEGER, quiz_id INTEGER,
+    question_id INTEGER, option_selected INTEGER
+);
+"""
+
+MIGRATED_INDEXES = {
+    "chapter": {"ix_chapter_subjectid"},
+    "quiz": {"ix_quiz_chapterid", "ix_quiz_subjectid"},
+    "question": {"ix_question_quiz_id"},
+    "score": {"ix_score_user_id", "ix_score_timestamp_of_attempt"},
+    "result": {"ix_result_quiz_id"},
+    "user_response": {"ix_user_response_user_quiz"},
+}
+
+
+def upgrade(fresh):
+    """What init_database does: create_all, then migrate, under the lock."""
+    with migrations.schema_lock(db.engine):
+        db.create_all()
+        return migrations.upgrade(db.engine, fresh=fresh)
+
+
+def index_names(table):
+    return {index["name"] for index in inspect(db.engine).get_indexes(table)}
+
+
+def test_hot_queries_use_their_indexes(make_app):
+    app = make_app()
+    with app.app_context():
+        upgrade(fresh=True)
+        checks = check_query_plans(db.engine)
+
+    assert len(checks) == len(HOT_QUERIES)
+    for name, index, plan, ok in checks:
+        assert ok, f"{name} does not use {index}: {plan}"
+
+
+def test_hot_query_check_catches_a_missing_index(make_app):
+    app = make_app()
+    with app.app_context():
+        upgrade(fresh=True)
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql("DROP INDEX ix_score_user_id")
+        failed = [name for name, _, _, ok in check_query_plans(db.engine) if not ok]
+
+    assert failed == ["a user's scores"]
+
+
+def test_upgrade_migrates_a_baseline_database(make_app, tmp_path):
+    conn = sqlite3.connect(tmp_path / "quizz.db")
+    conn.executescript(BASELINE_SCHEMA)
+    # Two attempts by user 7 at quiz 1 (questions 1-3), with their scores
+    conn.executemany(
+        "INSERT INTO user_response (user_id, quiz_id, question_id, option_selected) "
+        "VALUES (7, 1, ?, ?)",
+        [(1, 1), (2, -1), (3, 4), (1, 2), (2, 2), (3, 3)],
+    )
+    conn.executemany(
+        "INSERT INTO score (id, quiz_id, user_id, total_score) VALUES (?, 1, 7, 0)",
+        [(10,), (11,)],
+    )
+    conn.commit()
+    conn.close()
+
+    app = make_app()
+    with app.app_context():
+        applied = upgrade(fresh=False)
+        assert applied == [version for version, _, _ in migrations.MIGRATIONS]
+        assert all(applied for _, _, applied in migrations.status(db.engine))
+
+        for table, expected in MIGRATED_INDEXES.items():
+            assert expected <= index_names(table), table
+
+        attempts = db.session.query(AttemptAnswers).order_by(AttemptAnswers.id).all()
+        assert [a.score_id for a in attempts] == [10, 11]
+        assert [attempt_responses(a) for a in attempts] == [
+            {1: 1, 2: -1, 3: 4},
+            {1: 2, 2: 2, 3: 3},
+        ]
+        # The legacy rows stay until a later migration drops the table
+        legacy = db.session.execute(db.text("SELECT count(*) FROM user_response"))
+        assert legacy.scalar() == 6
+
+        assert all(ok for _, _, _, ok in check_query_plans(db.engine))
+
+        # A second start finds nothing to do
+        assert upgrade(fresh=False) == []
@@ -0,0 +1,243 @@
+import bisect
+import heapq
+import sys
+import threading
+import time
+
+from models import Chapter, Question, Quiz, Subject, User, db
+
+# entity -> (model, label column, search term column)
+SOURCES = {
+    "user": (User, User.fullname, User.name_search_term),
+    "subject": (Subject, Subject.name, Subject.name_search_term),
+    "chapter": (Chapter, Chapter.name, Chapter.name_search_term),
+    "quiz": (Quiz, Quiz.remarks, Quiz.remarks),
+    "question": (Question, Question.question_statement, Question.question_search_term),
+}
+
+# Short queries walk the sorted token list; cap how far so one letter stays cheap
+PREFIX_SCAN_LIMIT = 256
+
+# Only the head of long texts (question statements) gets trigram postings,
+# which keeps memory bounded; word prefixes still match anywhere in the text
+TRIGRAM_CHARS = 48
+
+
+def normalize(value):
+    return " ".join((value or "").lower().split())
+
+
+def trigrams(term):
+    padded = f" {term[:TRIGRAM_CHARS]} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class TypeaheadIndex:
+    """
+    In-process prefix/trigram index over the admin-searchable entities.
+
+    Queries shorter than three characters use a sorted token list (prefix
+    match); longer ones intersect trigram posting sets and confirm with a
+    substring check. The index loads lazily on first use and is kept current by
+    `upsert`/`remove` calls from the CRUD handlers; bulk or cascading writes
+    call `invalidate` so the next query reloads.
+
+    Each worker process holds its own copy. `version` returns the shared
+    version every write bumps (or None when it cannot be read); a query that
+    sees a version other than the one the index was built at rebuilds it, so
+    writes handled by other processes show up too. While the version is
+    unknown the index is rebuilt once it is `max_age` seconds old.
+    """
+
+    def __init__(self, version=None, max_age=None):
+        self._lock = threading.RLock()
+        self._current_version = version
+        self.max_age = max_age
+        self._loaded = False
+        self._version = None
+        self._entries = {}
+        self._tokens = []
+        self._postings = {}
+        self.loaded_at = None
+        self.load_seconds = 0.0
+
+    # --------------------------- maintenance ---------------------------
+    def invalidate(self):
+        with self._lock:
+            self._loaded = False
+            self._entries = {}
+            self._tokens = []
+            self._postings = {}
+
+    def _is_current(self, version):
+        if not self._loaded:
+            return False
+        if version is not None:
+            return version == self._version
+        if self._version is not None:
+            return False
+        return self.max_age is None or time.time() - self.loaded_at < self.max_age
+
+    def ensure_loaded(self):
+        version = self._current_version() if self._current_version else None
+        if self._is_current(version):
+            return
+        with self._lock:
+            if self._is_current(version):
+                return
+            started = time.perf_counter()
+            entries = {}
+            for entity, (model, label_column, term_column) in SOURCES.items():
+                for row_id, label, term in db.session.query(
+                    model.id, label_column, term_column
+                ):
+                    entries[(entity, row_id)] = (label, normalize(term or label))
+
+            tokens, postings = [], {}
+            for key, (label, term) in entries.items():
+                tokens.extend((token, key) for token in set(term.split()))
+                for gram in trigrams(term):
+                    postings.setdefault(gram, set()).add(key)
+            tokens.sort()
+
+            self._entries, self._tokens, self._postings = entries, tokens, postings
+            self._loaded = True
+            self._version = version
+            self.loaded_at = time.time()
+            self.load_seconds = time.perf_counter() - started
+
+    def _advance(self, version):
+        # Keep the copy only if this write is the sole change since it loaded
+        if version is None or self._version is None or version != self._version + 1:
+            self._version = None if version is None else -1
+        else:
+            self._version = version
+
+    def upsert(self, entity, obj, version=None):
+        """
+        Add or refresh the entry for a model instance after it is committed;
+        `version` is the shared version the write bumped to.
+        """
+        _, label_column, term_column = SOURCES[entity]
+        label = getattr(obj, label_column.key)
+        term = normalize(getattr(obj, term_column.key) or label)
+        with self._lock:
+            if not self._loaded:
+                return
+            self._advance(version)
+            key = (entity, obj.id)
+            self._discard(key)
+            self._entries[key] = (label, term)
+            for token in set(term.split()):
+                bisect.insort(self._tokens, (token, key))
+            for gram in trigrams(term):
+                self._postings.setdefault(gram, set()).add(key)
+
+    def remove(self, entity, row_id, version=None):
+        with self._lock:
+            if self._loaded:
+                self._advance(version)
+                self._discard((entity, row_id))
+
+    def _discard(self, key):
+        old = self._entries.pop(key, None)
+        if old is None:
+            return
+        term = old[1]
+        for token in set(term.split()):
+            i = bisect.bisect_left(self._tokens, (token, key))
+            if i < len(self._tokens) and self._tokens[i] == (token, key):
+                del self._tokens[i]
+        for gram in trigrams(term):
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+
+    # ----------------------------- queries -----------------------------
+    def search(self, query, k=10, entity=None):
+        """Return the top `k` (entity, id, label) matches for `query`."""
+        self.ensure_loaded()
+        query = normalize(query)
+        if not query:
+            return []
+
+        with self._lock:
+            if len(query) < 3 or " " in query:
+                candidates = self._prefix_candidates(query.split()[0])
+            else:
+                candidates = self._trigram_candidates(query)
+                if len(candidates) < k:
+                    candidates |= self._prefix_candidates(query)
+
+            ranked = []
+            for key in candidates:
+                if entity and key[0] != entity:
+                    continue
+                label, term = self._entries[key]
+                if term.startswith(query):
+                    rank = 0
+                elif f" {query}" in term:
+                    rank = 1
+                elif query in term:
+                    rank = 2
+                else:
+                    continue
+                ranked.append((rank, len(term), key, label))
+
+        return [
+            {"type": key[0], "id": key[1], "label": label}
+            for _, _, key, label in heapq.nsmallest(k, ranked)
+        ]
+
+    def _prefix_candidates(self, prefix):
+        candidates = set()
+        i = bisect.bisect_left(self._tokens, (prefix,))
+        end = min(len(self._tokens), i + PREFIX_SCAN_LIMIT)
+        while i < end and self._tokens[i][0].startswith(prefix):
+            candidates.add(self._tokens[i][1])
+            i += 1
+        return candidates
+
+    def _trigram_candidates(self, query):
+        # Only the query's inner trigrams: padded edges would force word starts
+        grams = {query[i : i + 3] for i in range(len(query) - 2)}
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        candidates = set(postings[0])
+        for keys in postings[1:]:
+            candidates &= keys
+            if not candidates:
+                break
+        return candidates
+
+    # ------------------------------ stats ------------------------------
+    def stats(self):
+        with self._lock:
+            entries_bytes = sys.getsizeof(self._entries) + sum(
+                sys.getsizeof(key) + sys.getsizeof(label or "") + sys.getsizeof(term)
+                for key, (label, term) in self._entries.items()
+            )
+            tokens_bytes = sys.getsizeof(self._tokens) + sum(
+                sys.getsizeof(pair) + sys.getsizeof(pair[0]) for pair in self._tokens
+            )
+            postings_bytes = sys.getsizeof(self._postings) + sum(
+                sys.getsizeof(gram) + sys.getsizeof(keys)
+                for gram, keys in self._postings.items()
+            )
+            return {
+                "loaded": self._loaded,
+                "version": self._version,
+                "loaded_at": self.loaded_at,
+                "load_seconds": round(self.load_seconds, 4),
+                "entries": len(self._entries),
+                "tokens": len(self._tokens),
+                "trigrams": len(self._postings),
+                "postings": sum(len(keys) for keys in self._postings.values()),
+                "memory_bytes": {
+                    "entries": entries_bytes,
+                    "tokens": tokens_bytes,
+                    "trigrams": postings_bytes,
+                    "total": entries_bytes + tokens_bytes + postings_bytes,
+                },
+            }